@@ -1,75 +1,44 @@
-import logging
 import os
-from datetime import datetime
 
-import boto3
 import redis
-import sentry_sdk
-import watchtower
-from botocore.exceptions import ClientError, NoCredentialsError
-from flask import Flask, jsonify, render_template, redirect, url_for
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_talisman import Talisman
-from sentry_sdk.integrations.flask import FlaskIntegration
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from config import get_config
+from app.json_provider import init_json_provider
+from app.database import RoutingSession, configure_database
+from app.rate_limits import TIERED_STRATEGY
+from app.telemetry import init_telemetry
 from app.constants import (
     REDIS_SOCKET_TIMEOUT,
     REDIS_CONNECT_TIMEOUT,
     LIMITER_CONNECT_TIMEOUT,
     HTTP_404_NOT_FOUND,
     HTTP_400_BAD_REQUEST,
-    HTTP_429_TOO_MANY_REQUESTS,
     HTTP_500_INTERNAL_SERVER_ERROR
 )
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 limiter = None
 
 
-def setup_cloudwatch_logging(app):
-    """Set up CloudWatch logging."""
-    try:
-        # Generate a stream name based on date and EC2 instance ID
-        date_str = datetime.utcnow().strftime("%Y-%m-%d")
-        try:
-            # Safe fetch for instance ID
-            instance_id = boto3.utils.InstanceMetadataFetcher().get_instance_identity()[
-                "instanceId"
-            ]
-        except Exception:
-            instance_id = "unknown"
-
-        stream_name = f"{date_str}-{instance_id}"
-
-        # Set up logging to CloudWatch
-        cloudwatch_handler = watchtower.CloudWatchLogHandler(
-            log_group="/ec2/myapp",
-            stream_name=stream_name,
-        )
-
-        # Add the CloudWatch handler
-        app.logger.addHandler(cloudwatch_handler)
-        logging.getLogger("werkzeug").addHandler(cloudwatch_handler)
-
-        # Add StreamHandler for local debugging and instance logs
-        app.logger.addHandler(logging.StreamHandler())
-        app.logger.setLevel(logging.INFO)
-        app.logger.info(f"App startup on instance {instance_id}")
-
-    except (ClientError, NoCredentialsError, Exception) as e:
-        # Catch ALL AWS errors so app works locally without creds
-        fallback_handler = logging.StreamHandler()
-        app.logger.addHandler(fallback_handler)
-        app.logger.setLevel(logging.INFO)
-        app.logger.warning(f"CloudWatch logging disabled: {e}")
-
+def create_redis_client(app, decode_responses):
+    """Create a Redis client from the app configuration."""
+    return redis.Redis(
+        host=app.config["REDIS_HOST"],
+        port=app.config["REDIS_PORT"],
+        decode_responses=decode_responses,
+        password=app.config["REDIS_PASSWORD"],
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_timeout=REDIS_CONNECT_TIMEOUT,
+    )
 
 
 def create_app():
@@ -84,22 +53,19 @@ def create_app():
     # Configure app to work with proxy
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 
-    # Initialize migrations
+    # Use the fastest available JSON encoder
+    init_json_provider(app)
+
+    # Initialize the database, with pool settings and the optional read replica from config
+    configure_database(app)
     db.init_app(app)
 
     migrate.init_app(app, db)
 
-    # Initialize Sentry
-    if not app.debug:
-        sentry_sdk.init(
-            dsn=app.config["SENTRY_DSN"],
-            integrations=[FlaskIntegration(transaction_style="url")],
-            traces_sample_rate=1.0,
-            environment=app.config["FLASK_ENV"],
-        )
-
-        setup_cloudwatch_logging(app)
+    # Initialize Sentry and log shipping
+    init_telemetry(app)
 
+    if not app.debug:
         Talisman(
             app,
             content_security_policy={
@@ -130,18 +96,13 @@ def create_app():
 
     # Initialize Redis
     try:
-        redis_client = redis.Redis(
-            host=app.config["REDIS_HOST"],
-            port=app.config["REDIS_PORT"],
-            decode_responses=True,
-            password=app.config["REDIS_PASSWORD"],
-            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
-            socket_timeout=REDIS_CONNECT_TIMEOUT,
-        )
+        redis_client = create_redis_client(app, decode_responses=True)
         redis_client.ping()  # Test connection
         app.config["REDIS_CLIENT"] = redis_client
+        # Binary-safe client for raw bytes such as QR code PNGs
+        app.config["REDIS_BINARY_CLIENT"] = create_redis_client(app, decode_responses=False)
         
-        # Initialize rate limiter with Redis
+        # Initialize rate limiter with per-worker counters synchronized to Redis in batches
         redis_uri = f"redis://{app.config['REDIS_HOST']}:{app.config['REDIS_PORT']}"
         if app.config.get('REDIS_PASSWORD'):
             redis_uri = f"redis://:{app.config['REDIS_PASSWORD']}@{app.config['REDIS_HOST']}:{app.config['REDIS_PORT']}"
@@ -150,7 +111,7 @@ def create_app():
             get_remote_address,
             storage_uri=redis_uri,
             storage_options={"socket_connect_timeout": LIMITER_CONNECT_TIMEOUT},
-            strategy="fixed-window-elastic-expiry",
+            strategy=TIERED_STRATEGY,
         )
         limiter.init_app(app)
         
@@ -163,12 +124,24 @@ def create_app():
                 self.store = {}
             def get(self, key):
                 return self.store.get(key)
+            def mget(self, keys):
+                return [self.store.get(key) for key in keys]
             def setex(self, key, time, value):
                 self.store[key] = value
             def set(self, key, value):
                 self.store[key] = value
+            def delete(self, *keys):
+                for key in keys:
+                    self.store.pop(key, None)
+            def hset(self, key, mapping):
+                self.store.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+            def hgetall(self, key):
+                return dict(self.store.get(key, {}))
+            def expire(self, key, time):
+                pass
                 
         app.config["REDIS_CLIENT"] = MockRedis()
+        app.config["REDIS_BINARY_CLIENT"] = app.config["REDIS_CLIENT"]
         
         # Initialize rate limiter with memory storage
         limiter = Limiter(
@@ -188,41 +161,60 @@ def create_app():
     app.register_blueprint(api, url_prefix="/api")
     app.register_blueprint(main)
 
-    # Create database tables
-    with app.app_context():
-        try:
-            db.create_all()
-        except Exception as e:
-            app.logger.error(f"Failed to create database tables: {str(e)}")
-            raise
+    # Sample per-request timings and query counts, and serve /metrics
+    from .instrumentation import init_instrumentation
+
+    init_instrumentation(app)
+
+    # Register CLI commands
+    from .commands import inventory_cli, users_cli, vouchers_cli, places_cli, assets_cli, schema_cli
+
+    app.cli.add_command(inventory_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(vouchers_cli)
+    app.cli.add_command(places_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(schema_cli)
+
+    # Serve fingerprinted static files and compress dynamic responses
+    from .assets import init_assets
+    from .compression import init_compression
+
+    init_assets(app)
+    init_compression(app)
+
+    # Encode fixed response bodies once
+    from .helpers import encode_static_payloads, static_response
+
+    encode_static_payloads(app)
+
+    # Answer throttled requests cheaply
+    from .throttling import init_throttling
+
+    init_throttling(app)
 
     # Error handlers
     @app.errorhandler(HTTP_404_NOT_FOUND)
     def not_found_error(error):
         """Handle 404 errors."""
-        return jsonify({"html": render_template("error.html"), "is_home": False}), HTTP_404_NOT_FOUND
+        return static_response("error_page", HTTP_404_NOT_FOUND)
 
     @app.errorhandler(HTTP_400_BAD_REQUEST)
     def bad_request_error(error):
         """Handle 400 errors."""
-        return jsonify({"html": render_template("error.html"), "is_home": False}), HTTP_400_BAD_REQUEST
-
-    @app.errorhandler(HTTP_429_TOO_MANY_REQUESTS)
-    def ratelimit_handler(e):
-        """Handle rate limit errors."""
-        return redirect(url_for("main.catch_all"))
+        return static_response("error_page", HTTP_400_BAD_REQUEST)
 
     @app.errorhandler(HTTP_500_INTERNAL_SERVER_ERROR)
     def internal_error(error):
         """Handle 500 errors."""
         db.session.rollback()
         app.logger.error("Server Error: %s", str(error))
-        return jsonify({"html": render_template("error.html"), "is_home": False}), HTTP_500_INTERNAL_SERVER_ERROR
+        return static_response("error_page", HTTP_500_INTERNAL_SERVER_ERROR)
 
     @app.errorhandler(Exception)
     def unhandled_exception(e):
         """Handle unhandled exceptions."""
         app.logger.error("Unhandled Exception: %s", str(e))
-        return jsonify({"html": render_template("error.html"), "is_home": False}), HTTP_500_INTERNAL_SERVER_ERROR
+        return static_response("error_page", HTTP_500_INTERNAL_SERVER_ERROR)
 
     return app
@@ -17,12 +17,24 @@ from app.helpers import (
     get_random_discount,
     render_voucher,
     render_home,
-    get_user_state,
     render_claimed_voucher,
     render_redeemed,
     return_generic_error,
-    get_stores_with_discounts,
+    static_response,
 )
+from app.catalog import get_available_categories, get_stores_with_discounts
+from app.user_state import (
+    resolve_user_state,
+    get_cached_user_state,
+    cache_user_state,
+    invalidate_user_state,
+)
+from app.inventory import release_discount
+from app.database import read_only, stick_to_primary
+from app.telemetry import report_validation_errors
+from app.user_cache import get_cached_user_record, cache_user_record
+from app.qr_codes import pregenerate_qr_code
+from app.places import autocomplete as autocomplete_places, place_location, is_place_cached
 import requests
 import sentry_sdk
 
@@ -36,13 +48,14 @@ api = Blueprint("api", __name__)
 
 
 @api.route("/initial_load", methods=["POST"])
+@read_only
 def initial_load():
     """Handle initial load of the application."""
     try:
         inputs = InitialLoadInput(request)
         
         if not inputs.validate():
-            sentry_sdk.capture_message(inputs.errors, level="warning")
+            report_validation_errors(inputs.errors)
             return jsonify({"error": "Invalid input", "messages": inputs.errors}), HTTP_400_BAD_REQUEST
         
         data = request.get_json()
@@ -57,40 +70,28 @@ def initial_load():
             logger.warning("Missing required data in initial_load request")
             return return_generic_error()
 
-        user = User.query.filter_by(device_id=device_id).first()
-
-        if user:
-            state, discount, claimed = get_user_state(user.id)
+        cached_state = get_cached_user_state(device_id)
+        if cached_state:
+            return current_app.response_class(cached_state, mimetype="application/json")
 
-            if state == "home":
-                categories = (
-                    db.session.query(Discount.category)
-                    .filter(Discount.available == True)
-                    .distinct()
-                    .all()
-                )
-                categories = ["Any"] + [category[0] for category in categories]
-
-                return render_home(categories)
-            elif state == "reroll":
-                return render_voucher(discount, user, claimed.selected_category)
-            elif state == "voucher":
-                return render_claimed_voucher(discount, claimed)
-            elif state == "redeemed":
-                return render_redeemed()
+        state, user, discount, claimed = resolve_user_state(device_id)
 
-            logger.error(f"Unexpected state in initial_load: {state}")
+        if state == "home":
+            response = render_home(get_available_categories())
+        elif state == "reroll":
+            response = render_voucher(discount, user, claimed.selected_category)
+        elif state == "voucher":
+            response = render_claimed_voucher(discount, claimed)
+        elif state == "redeemed":
+            response = render_redeemed()
         else:
-            categories = (
-                    db.session.query(Discount.category)
-                    .filter(Discount.available == True)
-                    .distinct()
-                    .all()
-                )
-            categories = ["Any"] + [category[0] for category in categories]
-            return render_home(categories)
-        
-        return jsonify({"error": "An unexpected error occurred"}), HTTP_500_INTERNAL_SERVER_ERROR
+            logger.error(f"Unexpected state in initial_load: {state}")
+            return jsonify({"error": "An unexpected error occurred"}), HTTP_500_INTERNAL_SERVER_ERROR
+
+        # Render helpers return a (response, status) tuple on failure, which is never cached
+        if not isinstance(response, tuple):
+            cache_user_state(device_id, response)
+        return response
     except Exception as e:
         logger.error(f"Error in initial_load: {str(e)}", exc_info=True)
         sentry_sdk.capture_exception(e)
@@ -104,7 +105,7 @@ def get_discount():
     try:
         inputs = GetRerollDiscountInput(request)
         if not inputs.validate():
-            sentry_sdk.capture_message(inputs.errors, level="warning")
+            report_validation_errors(inputs.errors)
             return jsonify({"error": "Invalid input", "messages": inputs.errors}), HTTP_400_BAD_REQUEST
         
         data = request.get_json()
@@ -118,7 +119,18 @@ def get_discount():
         if not user_lat or not user_long:
             logger.warning("No location available in get_discount request")
             return return_generic_error()
-        
+
+        record = get_cached_user_record(device_id)
+        if record and record.claimed_today:
+            logger.warning(f"User already claimed and tried rolling again: {device_id}")
+            return return_generic_error()
+
+        if record and record.rerolls <= 0:
+            logger.info(
+                f"User {record.id} has no rerolls left and pinged get discount endpoint."
+            )
+            return return_generic_error()
+
         user = User.query.filter_by(device_id=device_id).first()
 
         if not user:
@@ -126,6 +138,9 @@ def get_discount():
             db.session.add(user)
             db.session.flush()
         else:           
+            if not record:
+                cache_user_record(device_id, user)
+
             if user.claimed_today:
                 logger.warning(f"User already claimed and tried rolling again: {device_id}")
                 return return_generic_error()
@@ -151,12 +166,7 @@ def get_discount():
 
         if not discount:
             logger.warning("No discounts available for user location")
-            return jsonify(
-                {
-                    "error": "No discounts available",
-                    "message": "No discounts available. Please try again later.",
-                }
-            )
+            return static_response("no_discounts")
 
         claimed = Claimed(
             claimed_by=user.id,
@@ -165,13 +175,12 @@ def get_discount():
             selected_category=category,
         )
         db.session.add(claimed)
-
-        if not discount.unlimited_use:
-            discount.remaining -= 1
-            if discount.remaining <= 0:
-                discount.available = False
-
+        db.session.flush()
+        stick_to_primary(token=claimed.token)
         db.session.commit()
+        cache_user_record(device_id, user)
+        invalidate_user_state(device_id)
+        pregenerate_qr_code(claimed.token)
 
         return render_voucher(discount, user, claimed.selected_category)
     except Exception as e:
@@ -187,7 +196,7 @@ def reroll():
     try:
         inputs = GetRerollDiscountInput(request)
         if not inputs.validate():
-            sentry_sdk.capture_message(inputs.errors, level="warning")
+            report_validation_errors(inputs.errors)
             return jsonify({"error": "Invalid input", "messages": inputs.errors}), HTTP_400_BAD_REQUEST
         
         data = request.get_json()
@@ -197,11 +206,19 @@ def reroll():
         user_timezone = data.get("timezone")
         category = data.get("category")
 
+        record = get_cached_user_record(device_id)
+        if record and record.claimed_today:
+            logger.warning(f"User already claimed and tried rolling again: {device_id}")
+            return return_generic_error()
+
         user = User.query.filter_by(device_id=device_id).first()
         if not user:
             logger.warning(f"User not found for device_id: {device_id}")
             return return_generic_error()
 
+        if not record:
+            cache_user_record(device_id, user)
+
         if user.claimed_today:
             logger.warning(f"User already claimed and tried rolling again: {device_id}")
             return return_generic_error()
@@ -220,11 +237,7 @@ def reroll():
             claimed_by=user.id, valid=True, claimed=None
         ).first()
         if previous_claim:
-            previous_discount = Discount.query.get(previous_claim.discount_id)
-            if not previous_discount.unlimited_use:
-                previous_discount.remaining += 1
-                if previous_discount.remaining > 0:
-                    previous_discount.available = True
+            release_discount(Discount.query.get(previous_claim.discount_id))
 
         discount = get_random_discount(
             user_lat,
@@ -235,17 +248,7 @@ def reroll():
 
         if not discount:
             logger.warning("No other discounts available for reroll")
-            return jsonify(
-                {
-                    "error": "No discounts available",
-                    "message": "No other discounts available. Please try again later or claim the current discount.",
-                }
-            )
-
-        if not discount.unlimited_use:
-            discount.remaining -= 1
-            if discount.remaining <= 0:
-                discount.available = False
+            return static_response("no_reroll_discounts")
 
         if previous_claim:
             previous_claim.claimed = False
@@ -259,8 +262,13 @@ def reroll():
         )
 
         db.session.add(claimed)
+        db.session.flush()
+        stick_to_primary(token=claimed.token)
         user.rerolls -= 1
         db.session.commit()
+        cache_user_record(device_id, user)
+        invalidate_user_state(device_id)
+        pregenerate_qr_code(claimed.token)
 
         return render_voucher(discount, user, claimed.selected_category)
     except Exception as e:
@@ -276,12 +284,17 @@ def claim_discount():
     try:
         inputs = ClaimDiscountInput(request)
         if not inputs.validate():
-            sentry_sdk.capture_message(inputs.errors, level="warning")
+            report_validation_errors(inputs.errors)
             return jsonify({"error": "Invalid input", "messages": inputs.errors}), HTTP_400_BAD_REQUEST
         
         data = request.get_json()
         device_id = data.get("device_id")
 
+        record = get_cached_user_record(device_id)
+        if record and record.claimed_today:
+            logger.warning(f"User already claimed and tried rolling again: {device_id}")
+            return return_generic_error()
+
         user = User.query.filter_by(device_id=device_id).first()
         if not user:
             logger.warning(f"User not found for device_id: {device_id}")
@@ -306,6 +319,8 @@ def claim_discount():
 
         user.claimed_today = True
         db.session.commit()
+        cache_user_record(device_id, user)
+        invalidate_user_state(device_id)
 
         return render_claimed_voucher(discount, claimed)
     except Exception as e:
@@ -315,6 +330,7 @@ def claim_discount():
 
 
 @api.route("/get_stores", methods=["GET"])
+@read_only
 def get_stores():
     """Get a list of stores with available discounts."""
     try:
@@ -334,20 +350,13 @@ def autocomplete():
         inputs = AutocompleteInput(request)
 
         if not inputs.validate():
-            sentry_sdk.capture_message(inputs.errors, level="warning")
+            report_validation_errors(inputs.errors)
             return jsonify({"error": "Invalid input", "messages": inputs.errors}), HTTP_400_BAD_REQUEST
         
         data = request.get_json()
         query = data.get("query")
 
-        google_api_key = current_app.config["GOOGLE_PLACES_API_KEY"]
-        url = f"https://maps.googleapis.com/maps/api/place/autocomplete/json?input={query}&key={google_api_key}&components=country:au"
-
-        response = requests.get(url)
-        response.raise_for_status()
-        results = response.json()["predictions"]
-
-        return jsonify(results)
+        return jsonify(autocomplete_places(query))
     except requests.RequestException as e:
         logger.error(f"Error fetching autocomplete results: {str(e)}", exc_info=True)
         sentry_sdk.capture_exception(e)
@@ -355,28 +364,21 @@ def autocomplete():
 
 
 @api.route("/place_details", methods=["POST"])
-@limiter.limit(RATE_LIMIT_PLACE_DETAILS)
+@limiter.limit(RATE_LIMIT_PLACE_DETAILS, exempt_when=is_place_cached)
 def place_details():
     """Get details for a specific place."""
     try:
         inputs = PlaceDetailsInput(request)
         
         if not inputs.validate():
-            sentry_sdk.capture_message(inputs.errors, level="warning")
+            report_validation_errors(inputs.errors)
             return jsonify({"error": "Invalid input", "messages": inputs.errors}), HTTP_400_BAD_REQUEST
 
         data = request.get_json()
 
         place_id = data.get("place_id")
 
-        google_api_key = current_app.config["GOOGLE_PLACES_API_KEY"]
-        url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&fields=geometry&key={google_api_key}"
-
-        response = requests.get(url)
-        response.raise_for_status()
-        result = response.json()["result"]
-        lat = result["geometry"]["location"]["lat"]
-        lng = result["geometry"]["location"]["lng"]
+        lat, lng = place_location(place_id)
         return jsonify({"lat": lat, "lng": lng})
     except requests.RequestException as e:
         logger.error(f"Error fetching place details: {str(e)}", exc_info=True)
@@ -419,6 +421,7 @@ def redeem_voucher(token):
         claimed.redeemed_time = datetime.now(timezone.utc)
         claimed.valid = False
         db.session.commit()
+        invalidate_user_state(claimed.user.device_id)
         return jsonify(
             {
                 "alert": "Voucher redeemed.",
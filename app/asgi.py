@@ -0,0 +1,191 @@
+import asyncio
+import io
+import logging
+import httpx
+import sentry_sdk
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from flask import g, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app import metrics
+from app.places import DeferredUpstreamCall, places_url
+from app.constants import (
+    PLACES_ASYNC_MAX_CONNECTIONS,
+    PLACES_CONNECT_TIMEOUT,
+    PLACES_READ_TIMEOUT,
+    ASGI_WSGI_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+# Async routes: how to render the finished lookup, and the error body if the upstream call fails
+ASYNC_ROUTES = {
+    "/api/autocomplete": (
+        lambda predictions: jsonify(predictions),
+        {"error": "Unable to fetch autocomplete results"},
+    ),
+    "/api/place_details": (
+        lambda location: jsonify({"lat": location[0], "lng": location[1]}),
+        {"error": "Unable to fetch place details"},
+    ),
+}
+
+
+def _environ_of(environ, start_response):
+    return environ
+
+
+class PlacesASGIApp:
+    """ASGI entry point that serves the Places endpoints on the event loop.
+
+    Each request to an async route runs through the Flask view on a worker
+    thread, so the blueprint's validation, rate limits and caches all apply.
+    If the view needs the Places API it stops with DeferredUpstreamCall, and
+    the call is made here on a shared httpx client. Identical in-flight calls
+    are coalesced into one. Every other route goes to the Flask app's WSGI
+    interface unchanged.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIMiddleware(flask_app, workers=ASGI_WSGI_WORKERS)
+        self.client = None
+        self.in_flight = {}
+
+        # Apply the same proxy header handling as the WSGI stack
+        proxy = flask_app.wsgi_app
+        self.fix_environ = _environ_of
+        if isinstance(proxy, ProxyFix):
+            self.fix_environ = ProxyFix(
+                _environ_of,
+                x_for=proxy.x_for,
+                x_proto=proxy.x_proto,
+                x_host=proxy.x_host,
+                x_port=proxy.x_port,
+                x_prefix=proxy.x_prefix,
+            )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in ASYNC_ROUTES:
+            return await self.wsgi(scope, receive, send)
+
+        body = await self._read_body(receive)
+        response = await self._handle(scope, body)
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in response.headers.items()
+            ],
+        })
+        await send({"type": "http.response.body", "body": response.get_data()})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.client:
+                    await self.client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    def _environ(self, scope, body):
+        return self.fix_environ(build_environ(scope, io.BytesIO(body)), None)
+
+    async def _handle(self, scope, body):
+        """Run the Flask view, making any Places API call it defers on the event loop."""
+        deferred, response = await asyncio.to_thread(self._dispatch, self._environ(scope, body))
+        if deferred is None:
+            return response
+
+        render, error_body = ASYNC_ROUTES[scope["path"]]
+        try:
+            payload = await self._fetch(deferred.endpoint, deferred.params)
+        except httpx.HTTPError as e:
+            logger.error(f"Error calling Places {deferred.endpoint}: {str(e)}", exc_info=True)
+            sentry_sdk.capture_exception(e)
+            return await asyncio.to_thread(
+                self._finish, self._environ(scope, body), lambda: jsonify(error_body)
+            )
+        return await asyncio.to_thread(
+            self._finish, self._environ(scope, body), lambda: render(deferred.finish(payload))
+        )
+
+    def _dispatch(self, environ):
+        """Dispatch a request like Flask would, stopping at a deferred upstream call.
+
+        Returns (DeferredUpstreamCall, None) or (None, response).
+        """
+        app = self.flask_app
+        with app.request_context(environ):
+            g.defer_places_upstream = True
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    rv = app.dispatch_request()
+            except DeferredUpstreamCall as deferred:
+                return deferred, None
+            except Exception as e:
+                rv = self._handle_exception(e)
+            return None, app.process_response(app.make_response(rv))
+
+    def _finish(self, environ, respond):
+        """Build the response for a completed upstream call in a fresh request context."""
+        app = self.flask_app
+        with app.request_context(environ):
+            try:
+                rv = respond()
+            except Exception as e:
+                rv = self._handle_exception(e)
+            return app.process_response(app.make_response(rv))
+
+    def _handle_exception(self, e):
+        try:
+            return self.flask_app.handle_user_exception(e)
+        except Exception as unhandled:
+            return self.flask_app.handle_exception(unhandled)
+
+    async def _fetch(self, endpoint, params):
+        """GET a Places endpoint, sharing the result with identical calls already in flight."""
+        key = (endpoint, tuple(sorted(params.items())))
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._get_json(endpoint, params))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            metrics.increment("places.upstream_coalesced")
+        # Shielded so one client disconnecting does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _get_json(self, endpoint, params):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=PLACES_ASYNC_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(PLACES_READ_TIMEOUT, connect=PLACES_CONNECT_TIMEOUT),
+            )
+        with self.flask_app.app_context():
+            url = places_url(endpoint)
+        with metrics.timer(f"places.{endpoint}_upstream_seconds"):
+            response = await self.client.get(url, params=params)
+            response.raise_for_status()
+        return response.json()
+
+
+def create_asgi_app(flask_app):
+    """Wrap a Flask app so the Places endpoints are served asynchronously."""
+    return PlacesASGIApp(flask_app)
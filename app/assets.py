@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+from flask import current_app, request, send_from_directory
+from app.constants import (
+    ASSETS_DIST_DIR,
+    ASSETS_MANIFEST_NAME,
+    ASSETS_COMPRESSIBLE_EXTENSIONS,
+    ASSETS_MAX_AGE_SECONDS
+)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# url('...') in CSS and import ... from '...' in JS modules; group 2 is the path relative to the file
+CSS_URL_PATTERN = re.compile(r"""(url\(\s*['"]?)(?!data:|https?:|//)([^'")?#]+)""")
+JS_IMPORT_PATTERN = re.compile(r"""((?:\bfrom|\bimport)\s*\(?\s*['"])(\.{1,2}/[^'"]+)""")
+
+# Precompressed variants in order of preference, with their file suffixes
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _source_files(static_folder):
+    """Get every static file outside the build directory, relative to the static folder."""
+    for root, dirs, files in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder)
+        if rel_root == ASSETS_DIST_DIR or rel_root.startswith(ASSETS_DIST_DIR + os.sep):
+            dirs[:] = []
+            continue
+        for name in files:
+            yield posixpath.normpath(posixpath.join(rel_root.replace(os.sep, "/"), name))
+
+
+def _fingerprinted_name(path, content):
+    base, ext = posixpath.splitext(path)
+    return f"{base}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _compress(path, content):
+    """Write .gz (and .br when brotli is installed) next to a built file when it saves bytes."""
+    variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(content, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(content):
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+
+
+class _AssetBuilder:
+    """Fingerprints static files, rewriting references between CSS/JS files and their dependencies."""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.dist_folder = os.path.join(static_folder, ASSETS_DIST_DIR)
+        self.sources = set(_source_files(static_folder))
+        self.manifest = {}
+
+    def _rewrite(self, path, text, pattern):
+        """Point relative references at their fingerprinted copies."""
+        directory = posixpath.dirname(path)
+
+        def replace(match):
+            prefix, reference = match.groups()
+            target = posixpath.normpath(posixpath.join(directory, reference))
+            if target not in self.sources:
+                return match.group(0)
+            relative = posixpath.relpath(self.build(target), directory)
+            if reference.startswith("./") and not relative.startswith("."):
+                relative = f"./{relative}"
+            return prefix + relative
+
+        return pattern.sub(replace, text)
+
+    def build(self, path):
+        """Build one file and return its fingerprinted path, relative to the static folder."""
+        if path in self.manifest:
+            return self.manifest[path]
+
+        with open(os.path.join(self.static_folder, path), "rb") as f:
+            content = f.read()
+        ext = posixpath.splitext(path)[1].lower()
+        if ext == ".css":
+            content = self._rewrite(path, content.decode(), CSS_URL_PATTERN).encode()
+        elif ext == ".js":
+            content = self._rewrite(path, content.decode(), JS_IMPORT_PATTERN).encode()
+
+        built = _fingerprinted_name(path, content)
+        output = os.path.join(self.dist_folder, built)
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, "wb") as f:
+            f.write(content)
+        if ext in ASSETS_COMPRESSIBLE_EXTENSIONS:
+            _compress(output, content)
+
+        self.manifest[path] = built
+        return built
+
+
+def build_assets(static_folder):
+    """Fingerprint and precompress every static file into the build directory.
+
+    Returns the manifest mapping original paths to fingerprinted ones.
+    """
+    dist_folder = os.path.join(static_folder, ASSETS_DIST_DIR)
+    shutil.rmtree(dist_folder, ignore_errors=True)
+
+    builder = _AssetBuilder(static_folder)
+    for path in sorted(builder.sources):
+        builder.build(path)
+
+    with open(os.path.join(dist_folder, ASSETS_MANIFEST_NAME), "w") as f:
+        json.dump(builder.manifest, f, indent=2, sort_keys=True)
+    logger.info(f"Built {len(builder.manifest)} static assets")
+    return builder.manifest
+
+
+def load_manifest(static_folder):
+    """Load the asset manifest, or an empty one if the assets have not been built."""
+    try:
+        with open(os.path.join(static_folder, ASSETS_DIST_DIR, ASSETS_MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _serve_static(filename):
+    """Serve a static file, preferring a precompressed build and caching built files forever."""
+    is_built = filename.startswith(f"{ASSETS_DIST_DIR}/")
+    if is_built:
+        for encoding, suffix in ENCODINGS:
+            if encoding in request.accept_encodings and os.path.isfile(
+                os.path.join(current_app.static_folder, filename + suffix)
+            ):
+                response = send_from_directory(
+                    current_app.static_folder, filename + suffix, max_age=ASSETS_MAX_AGE_SECONDS
+                )
+                response.content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                response.content_encoding = encoding
+                break
+        else:
+            response = send_from_directory(
+                current_app.static_folder, filename, max_age=ASSETS_MAX_AGE_SECONDS
+            )
+        response.vary.add("Accept-Encoding")
+        response.cache_control.immutable = True
+        return response
+    return current_app.send_static_file(filename)
+
+
+def init_assets(app):
+    """Serve fingerprinted builds of static files when they have been built."""
+    manifest = load_manifest(app.static_folder)
+    app.extensions["asset_manifest"] = manifest
+    if not manifest:
+        return
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = f"{ASSETS_DIST_DIR}/{manifest[values['filename']]}"
+
+    app.view_functions["static"] = _serve_static
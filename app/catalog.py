@@ -0,0 +1,67 @@
+import json
+import logging
+from flask import current_app
+from app import db
+from app.cache import LRUCache
+from app.models import Discount, Store
+from app.constants import (
+    CACHE_TIMEOUT_SECONDS,
+    CATEGORIES_CACHE_KEY,
+    CATEGORIES_LOCAL_TTL_SECONDS,
+    STORES_CACHE_KEY
+)
+
+logger = logging.getLogger(__name__)
+
+# Process-local copy of the category list so the home page needs no Redis round trip either
+_local_cache = LRUCache(1, ttl=CATEGORIES_LOCAL_TTL_SECONDS)
+
+
+def get_available_categories():
+    """Get the categories offered on the home page, starting with "Any"."""
+    categories = _local_cache.get(CATEGORIES_CACHE_KEY)
+    if categories is not None:
+        return categories
+
+    redis_client = current_app.config['REDIS_CLIENT']
+    cached_result = redis_client.get(CATEGORIES_CACHE_KEY)
+
+    if cached_result:
+        categories = json.loads(cached_result)
+    else:
+        rows = (
+            db.session.query(Discount.category)
+            .filter(Discount.available == True)
+            .distinct()
+            .all()
+        )
+        categories = ["Any"] + [category[0] for category in rows]
+        redis_client.setex(CATEGORIES_CACHE_KEY, CACHE_TIMEOUT_SECONDS, json.dumps(categories))
+
+    _local_cache.set(CATEGORIES_CACHE_KEY, categories)
+    return categories
+
+
+def get_stores_with_discounts():
+    """Get a list of stores with available discounts."""
+    redis_client = current_app.config['REDIS_CLIENT']
+    
+    cached_result = redis_client.get(STORES_CACHE_KEY)
+    
+    if cached_result:
+        return json.loads(cached_result)
+    
+    stores = db.session.query(Store).join(Discount).filter(Discount.available == True).distinct().all()
+    store_list = [{"name": store.name} for store in stores]
+    
+    redis_client.setex(STORES_CACHE_KEY, CACHE_TIMEOUT_SECONDS, json.dumps(store_list)) 
+    return store_list
+
+
+def invalidate_catalog_caches():
+    """Drop cached categories and stores after a discount's availability flips."""
+    _local_cache.clear()
+    try:
+        current_app.config['REDIS_CLIENT'].delete(CATEGORIES_CACHE_KEY, STORES_CACHE_KEY)
+    except Exception as e:
+        logger.error(f"Failed to invalidate catalog caches: {str(e)}")
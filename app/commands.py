@@ -0,0 +1,135 @@
+import csv
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.constants import (
+    INVENTORY_RECONCILE_BATCH_SIZE,
+    DAILY_RESET_BATCH_SIZE,
+    SWEEPER_BATCH_SIZE,
+    BASELINE_SCHEMA_REVISION
+)
+
+inventory_cli = AppGroup("inventory", help="Manage voucher inventory counters.")
+users_cli = AppGroup("users", help="Manage users' daily limits.")
+vouchers_cli = AppGroup("vouchers", help="Maintain rolled and claimed vouchers.")
+places_cli = AppGroup("places", help="Manage cached Google Places data.")
+assets_cli = AppGroup("assets", help="Build static assets.")
+schema_cli = AppGroup("schema", help="Manage the database schema.")
+
+
+@inventory_cli.command("reconcile")
+@click.option("--batch-size", default=INVENTORY_RECONCILE_BATCH_SIZE, show_default=True)
+@click.option("--interval", type=float, default=None, help="Keep running, reconciling every N seconds.")
+def reconcile_command(batch_size, interval):
+    """Write Redis inventory counters back to the discounts table.
+
+    Run this on a schedule, or with --interval, because remaining counts only reach the table here.
+    """
+    from app.inventory import reconcile_inventory
+
+    while True:
+        updated = reconcile_inventory(batch_size)
+        click.echo(f"Reconciled {updated} discounts.")
+        if interval is None:
+            return
+        time.sleep(interval)
+
+
+@inventory_cli.command("reset")
+@click.argument("discount_id", type=int)
+def reset_command(discount_id):
+    """Re-seed a discount's counter from the database after a restock."""
+    from app.inventory import reset_inventory
+
+    reset_inventory(discount_id)
+    click.echo(f"Inventory counter for discount {discount_id} reset.")
+
+
+@users_cli.command("reset-daily")
+@click.option("--batch-size", default=DAILY_RESET_BATCH_SIZE, show_default=True)
+@click.option("--interval", type=float, default=None, help="Keep running, checking every N seconds.")
+def reset_daily_command(batch_size, interval):
+    """Restore rerolls and claimed_today for timezones past local midnight."""
+    from app.daily_reset import reset_daily_limits
+
+    while True:
+        reset = reset_daily_limits(batch_size)
+        click.echo(f"Reset {reset} users.")
+        if interval is None:
+            return
+        time.sleep(interval)
+
+
+@vouchers_cli.command("sweep")
+@click.option("--batch-size", default=SWEEPER_BATCH_SIZE, show_default=True)
+@click.option("--interval", type=float, default=None, help="Keep running, sweeping every N seconds.")
+def sweep_command(batch_size, interval):
+    """Invalidate expired vouchers and refund inventory held by abandoned rolls."""
+    from app.sweeper import sweep_expired_vouchers
+
+    while True:
+        result = sweep_expired_vouchers(batch_size)
+        rate = result.scanned / result.seconds if result.seconds else 0
+        click.echo(
+            f"Scanned {result.scanned} vouchers ({rate:.0f}/s): {result.expired} expired, "
+            f"{result.abandoned} abandoned, {result.refunded} units refunded."
+        )
+        if interval is None:
+            return
+        time.sleep(interval)
+
+
+@places_cli.command("warm")
+@click.argument("csv_file", type=click.File("r"))
+@click.option("--fetch-missing", is_flag=True, help="Fetch rows without lat/lng from the Places API.")
+def warm_command(csv_file, fetch_missing):
+    """Pre-load place coordinates from a CSV with place_id and optional lat, lng columns."""
+    from app.places import warm_locations
+
+    rows = (
+        (
+            row["place_id"],
+            float(row["lat"]) if row.get("lat") else None,
+            float(row["lng"]) if row.get("lng") else None,
+        )
+        for row in csv.DictReader(csv_file)
+    )
+    stored = warm_locations(rows, fetch_missing=fetch_missing)
+    click.echo(f"Stored {stored} place locations.")
+
+
+@assets_cli.command("build")
+def build_assets_command():
+    """Fingerprint and precompress static files into static/dist."""
+    from app.assets import build_assets
+
+    manifest = build_assets(current_app.static_folder)
+    click.echo(f"Built {len(manifest)} static assets. Restart the app to serve them.")
+
+
+@assets_cli.command("fonts")
+def build_fonts_command():
+    """Subset the bundled fonts to the characters in use and write WOFF2 copies."""
+    from app.fonts import build_fonts
+
+    for name, (before, after) in build_fonts(current_app).items():
+        click.echo(f"{name}: {before // 1024} KB -> {after // 1024} KB")
+
+
+@schema_cli.command("create")
+def create_schema_command():
+    """Create or upgrade the database schema by running the migrations.
+
+    A database whose tables were made by create_all before migrations existed is
+    stamped with the baseline revision first, so only the later migrations run.
+    """
+    from flask_migrate import stamp, upgrade
+    from sqlalchemy import inspect
+    from app import db
+
+    tables = inspect(db.engine).get_table_names()
+    if "users" in tables and "alembic_version" not in tables:
+        stamp(revision=BASELINE_SCHEMA_REVISION)
+    upgrade()
+    click.echo("Database schema is up to date.")
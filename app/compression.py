@@ -0,0 +1,37 @@
+import gzip
+from flask import request
+from app.constants import COMPRESS_MIN_BYTES, COMPRESS_LEVEL, COMPRESS_MIMETYPES
+
+
+def compress_response(response):
+    """Gzip JSON and HTML responses for clients that accept it."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.mimetype not in COMPRESS_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if "gzip" not in request.accept_encodings:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=COMPRESS_LEVEL))
+    response.content_encoding = "gzip"
+    # The compressed body is a different representation of the same content
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Compress dynamic JSON and HTML responses on the way out."""
+    app.after_request(compress_response)
@@ -1,12 +1,62 @@
 # Earth geometry
 EARTH_DEGREE_KM = 111.0
+EARTH_RADIUS_KM = 6371.0088
 
 # Redis and Caching
 QR_CODE_EXPIRY_SECONDS = 86500 
+# Followed by the renderer name, so png codes keep their original qr_png:<token> keys
+QR_CODE_KEY_PREFIX = "qr_"
+QR_CACHE_MAX_ENTRIES = 2048
+QR_CODE_MAX_AGE_SECONDS = 86400
+QR_PREGENERATE_WORKERS = 2
+QR_PREGENERATE_WAIT_SECONDS = 2
 CACHE_TIMEOUT_SECONDS = 3600
+CATEGORIES_CACHE_KEY = "available_categories"
+CATEGORIES_LOCAL_TTL_SECONDS = 30
+STORES_CACHE_KEY = "stores_with_discounts"
+USER_STATE_KEY_PREFIX = "user_state:"
+USER_STATE_CACHE_SECONDS = 30
+USER_RECORD_KEY_PREFIX = "user:"
+USER_RECORD_CACHE_SECONDS = 86400
+USER_RECORD_LOCAL_MAX_ENTRIES = 10000
+USER_RECORD_LOCAL_TTL_SECONDS = 5
+FRAGMENT_CACHE_MAX_ENTRIES = 4096
+FRAGMENT_CACHE_TTL_SECONDS = 300
+VOUCHER_FRAGMENT_TTL_SECONDS = 30
 REDIS_SOCKET_TIMEOUT = 5
 REDIS_CONNECT_TIMEOUT = 5
 LIMITER_CONNECT_TIMEOUT = 30
+DISCOUNT_INDEX_TTL_SECONDS = 60
+DISCOUNT_INDEX_MAX_ATTEMPTS = 5
+INVENTORY_KEY_PREFIX = "inventory:remaining:"
+INVENTORY_DIRTY_KEY = "inventory:dirty"
+INVENTORY_RECONCILE_BATCH_SIZE = 500
+SWEEPER_WATERMARK_KEY = "sweeper:watermark"
+SWEEPER_BATCH_SIZE = 1000
+# Migration matching the tables created by db.create_all() before migrations were added
+BASELINE_SCHEMA_REVISION = "3b1f6c2a9d10"
+
+# Google Places
+PLACES_AUTOCOMPLETE_KEY_PREFIX = "places:autocomplete:"
+PLACES_AUTOCOMPLETE_CACHE_SECONDS = 21600
+PLACES_AUTOCOMPLETE_MAX_RESULTS = 5
+PLACES_MIN_PREFIX_LENGTH = 3
+PLACES_POOL_SIZE = 10
+PLACES_CONNECT_TIMEOUT = 2
+PLACES_READ_TIMEOUT = 5
+PLACE_LOCATION_CACHE_MAX_ENTRIES = 10000
+PLACES_ASYNC_MAX_CONNECTIONS = 100
+ASGI_WSGI_WORKERS = 10
+
+# Static assets and compression
+ASSETS_DIST_DIR = "dist"
+ASSETS_MANIFEST_NAME = "manifest.json"
+ASSETS_COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".ttf", ".otf", ".json", ".html", ".txt")
+ASSETS_MAX_AGE_SECONDS = 31536000
+FONT_SOURCE_EXTENSIONS = (".ttf", ".otf")
+COMPRESS_MIN_BYTES = 500
+COMPRESS_LEVEL = 6
+COMPRESS_MIMETYPES = ("application/json", "text/html")
 
 # QR Code generation
 QR_BOX_SIZE = 10
@@ -14,6 +64,9 @@ QR_BORDER_SIZE = 1
 
 # User constraints
 DEFAULT_REROLLS = 2
+DAILY_RESET_BATCH_SIZE = 1000
+DAILY_RESET_DISCOVERY_KEY = "daily_reset:discovered_at"
+DAILY_RESET_DISCOVERY_SECONDS = 3600
 VOUCHER_EXPIRY_HOURS = 48
 
 # Database constraints
@@ -26,14 +79,43 @@ LATITUDE_MAX = 90
 LONGITUDE_MIN = -180
 LONGITUDE_MAX = 180
 
+# Read replicas
+REPLICA_MAX_LAG_SECONDS = 5
+REPLICA_LAG_CHECK_SECONDS = 5
+# A replica can fall further behind between lag checks, so stick to the primary for both windows
+STICKY_PRIMARY_SECONDS = REPLICA_MAX_LAG_SECONDS + REPLICA_LAG_CHECK_SECONDS
+STICKY_PRIMARY_KEY_PREFIX = "sticky_primary:"
+STICKY_PRIMARY_LOCAL_MAX_ENTRIES = 10000
+
+# Instrumentation
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+# Telemetry
+LOG_QUEUE_MAX_RECORDS = 10000
+LOCAL_SINK_MAX_ITEMS = 1000
+VALIDATION_WARNING_DEDUPE_SECONDS = 300
+VALIDATION_WARNING_DEDUPE_MAX_ENTRIES = 1000
+# Sentry trace sample rates by endpoint; everything else uses SENTRY_TRACES_SAMPLE_RATE
+TRACE_SAMPLE_RATES = {
+    "static": 0.0,
+    "instrumentation.prometheus_metrics": 0.0,
+    "main.qr_code": 0.001,
+    "api.autocomplete": 0.001,
+}
+
 # Rate limits
 RATE_LIMIT_STANDARD = "10 per minute; 100 per day"
 RATE_LIMIT_AUTOCOMPLETE = "45 per minute"
 RATE_LIMIT_AUTOCOMPLETE_DAILY = "190 per 24 hours"
 RATE_LIMIT_PLACE_DETAILS = "15 per 24 hours"
+RATE_LIMIT_LOCAL_MAX_KEYS = 100000
+RATE_LIMIT_SYNC_INTERVAL_SECONDS = 1
+RATE_LIMIT_UNSYNCED_SHARE = 0.2
 
 # HTTP Status Codes
 HTTP_400_BAD_REQUEST = 400
 HTTP_404_NOT_FOUND = 404
 HTTP_429_TOO_MANY_REQUESTS = 429
+THROTTLE_MAX_RETRY_AFTER_SECONDS = 3600
 HTTP_500_INTERNAL_SERVER_ERROR = 500
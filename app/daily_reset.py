@@ -0,0 +1,146 @@
+import logging
+import time
+from datetime import datetime
+import pytz
+from flask import current_app
+from sqlalchemy import or_, update
+from app import db
+from app.models import User, DailyReset
+from app.user_cache import invalidate_user_records
+from app.user_state import invalidate_user_state
+from app.constants import DEFAULT_REROLLS, DAILY_RESET_DISCOVERY_KEY, DAILY_RESET_DISCOVERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def _discover_timezones():
+    """Scan the users table for timezones, at most once per DAILY_RESET_DISCOVERY_SECONDS.
+
+    The time of the last scan is kept in Redis, so one-off runs share it. Returns
+    an empty list when a scan is not due.
+    """
+    client = current_app.config['REDIS_CLIENT']
+    try:
+        discovered_at = client.get(DAILY_RESET_DISCOVERY_KEY)
+    except Exception as e:
+        logger.error(f"Error reading timezone discovery time: {str(e)}")
+        discovered_at = None
+    if discovered_at and time.time() - float(discovered_at) < DAILY_RESET_DISCOVERY_SECONDS:
+        return []
+
+    names = [name for (name,) in db.session.query(User.timezone).distinct()]
+    try:
+        client.set(DAILY_RESET_DISCOVERY_KEY, str(time.time()))
+    except Exception as e:
+        logger.error(f"Error writing timezone discovery time: {str(e)}")
+    return names
+
+
+def _timezone_buckets(now, names):
+    """Group timezones by current UTC offset, with each zone's local date."""
+    buckets = {}
+    for name in names:
+        try:
+            local_now = now.astimezone(pytz.timezone(name))
+        except pytz.UnknownTimeZoneError:
+            logger.warning(f"Skipping daily reset for unknown timezone: {name}")
+            continue
+        buckets.setdefault(local_now.utcoffset(), []).append((name, local_now.date()))
+    return buckets
+
+
+def _lock_progress(name, local_date):
+    """Get and lock a timezone's progress row for the current transaction.
+
+    A timezone seen for the first time is recorded as already reset for its
+    current local date, so its users are only reset once local midnight passes.
+    """
+    progress = db.session.get(DailyReset, name, with_for_update=True)
+    if not progress:
+        progress = DailyReset(timezone=name, reset_date=local_date, last_user_id=0)
+        db.session.add(progress)
+    elif progress.reset_date is None:
+        progress.reset_date = local_date
+    return progress
+
+
+def _reset_timezone(name, local_date, batch_size):
+    """Reset every user in a timezone whose local day has rolled over.
+
+    Each batch commits together with the last user id it touched, so a run
+    interrupted part way resumes where it stopped rather than starting over.
+    Returns the number of users reset.
+    """
+    reset = 0
+    while True:
+        progress = _lock_progress(name, local_date)
+        if progress.reset_date >= local_date:
+            db.session.commit()
+            return reset
+        if progress.in_progress_date != local_date:
+            progress.in_progress_date = local_date
+            progress.last_user_id = 0
+
+        rows = (
+            db.session.query(User.id, User.device_id)
+            .filter(
+                User.timezone == name,
+                User.id > progress.last_user_id,
+                or_(User.claimed_today == True, User.rerolls != DEFAULT_REROLLS),
+            )
+            .order_by(User.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            progress.reset_date = local_date
+            progress.last_user_id = 0
+            db.session.commit()
+            logger.info(f"Daily reset for {name} ({local_date}) complete")
+            return reset
+
+        user_ids = [user_id for user_id, _ in rows]
+        db.session.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(rerolls=DEFAULT_REROLLS, claimed_today=False),
+            execution_options={"synchronize_session": False},
+        )
+        progress.last_user_id = user_ids[-1]
+        db.session.commit()
+
+        device_ids = [device_id for _, device_id in rows]
+        invalidate_user_records(device_ids)
+        invalidate_user_state(*device_ids)
+        reset += len(rows)
+
+
+def reset_daily_limits(batch_size, now=None):
+    """Reset rerolls and claimed_today for every timezone that has passed local midnight.
+
+    Timezones are handled one offset bucket at a time, easternmost first, so
+    each bucket is reset as soon as its midnight arrives. The zones come from
+    the daily_resets table; the users table is only scanned for new ones
+    every DAILY_RESET_DISCOVERY_SECONDS. Safe to run repeatedly; a timezone
+    is only reset once per local date.
+    Returns the number of users reset.
+    """
+    now = now or datetime.now(pytz.UTC)
+    done = {
+        progress.timezone: progress.reset_date
+        for progress in db.session.query(DailyReset.timezone, DailyReset.reset_date)
+    }
+
+    names = set(done).union(_discover_timezones())
+
+    reset = 0
+    for offset, zones in sorted(_timezone_buckets(now, names).items(), reverse=True):
+        for name, local_date in zones:
+            if done.get(name) and done[name] >= local_date:
+                continue
+            try:
+                reset += _reset_timezone(name, local_date, batch_size)
+            except Exception:
+                db.session.rollback()
+                raise
+    return reset
@@ -0,0 +1,282 @@
+import itertools
+import logging
+import threading
+import time
+from functools import wraps
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Delete, Insert, Update, event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from app import metrics
+from app.cache import LRUCache
+from app.constants import (
+    REPLICA_MAX_LAG_SECONDS,
+    REPLICA_LAG_CHECK_SECONDS,
+    STICKY_PRIMARY_SECONDS,
+    STICKY_PRIMARY_KEY_PREFIX,
+    STICKY_PRIMARY_LOCAL_MAX_ENTRIES
+)
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND_PREFIX = "replica_"
+READ_BIND = "read_bind"
+UNRESOLVED = object()
+WROTE = "wrote"
+STICKY_KEYS = "sticky_keys"
+
+# Seconds since the last replayed transaction, or 0 when the replica has replayed everything it received
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# Last measured lag by replica bind key, as (checked_at, seconds or None when unreachable)
+_lag_checks = {}
+# One lock per replica, so only one thread re-measures it at a time
+_lag_locks = {}
+_next_replica = itertools.count()
+
+# Keys written by this worker recently, so its own reads skip the replica even if Redis is down
+_sticky_cache = LRUCache(STICKY_PRIMARY_LOCAL_MAX_ENTRIES, ttl=STICKY_PRIMARY_SECONDS)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records checkout latency, saturation and timeouts in app.metrics.
+
+    Metrics are named after the engine's pool_logging_name, e.g. db.primary.pool_checkout_seconds.
+    """
+
+    def _record_saturation(self):
+        capacity = self.size() + max(self._max_overflow, 0)
+        metrics.gauge(f"db.{self.logging_name}.pool_in_use", self.checkedout())
+        metrics.gauge(f"db.{self.logging_name}.pool_saturation", self.checkedout() / capacity)
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            metrics.increment(f"db.{self.logging_name}.pool_timeouts")
+            raise
+        metrics.observe(f"db.{self.logging_name}.pool_checkout_seconds", time.perf_counter() - start)
+        self._record_saturation()
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._record_saturation()
+
+
+def engine_options(config, uri, name):
+    """Build create_engine options for a database URI from the app config."""
+    options = {
+        "pool_pre_ping": config["SQLALCHEMY_POOL_PRE_PING"],
+        "pool_recycle": config["SQLALCHEMY_POOL_RECYCLE"],
+        "pool_logging_name": name,
+    }
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        # SQLite keeps its own pool; in-memory databases need one connection per thread
+        return options
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=config["SQLALCHEMY_POOL_SIZE"],
+        max_overflow=config["SQLALCHEMY_MAX_OVERFLOW"],
+        pool_timeout=config["SQLALCHEMY_POOL_TIMEOUT"],
+    )
+    if config["DB_STATEMENT_TIMEOUT_MS"] and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+
+def configure_database(app):
+    """Set engine options for the primary database and register a bind per read replica."""
+    config = app.config
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(
+        config, config["SQLALCHEMY_DATABASE_URI"], "primary"
+    )
+
+    binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+    replica_binds = []
+    for index, uri in enumerate(config.get("SQLALCHEMY_REPLICA_URIS") or []):
+        bind_key = f"{REPLICA_BIND_PREFIX}{index}"
+        binds[bind_key] = {"url": uri, **engine_options(config, uri, bind_key)}
+        replica_binds.append(bind_key)
+    config["SQLALCHEMY_BINDS"] = binds
+    app.extensions["replica_binds"] = replica_binds
+
+
+def _measure_lag(engine):
+    """Get a replica's replication lag in seconds."""
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    with engine.connect() as connection:
+        return float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+
+
+def _replica_lag(bind_key, engine):
+    """Get a replica's lag, re-measuring it at most every REPLICA_LAG_CHECK_SECONDS.
+
+    Each replica has its own lock, and while one thread re-measures a replica the others keep using its
+    last known lag. Returns None if the replica could not be reached or another thread is checking it for
+    the first time.
+    """
+    checked_at, lag = _lag_checks.get(bind_key, (None, None))
+    if checked_at is not None and time.monotonic() - checked_at <= REPLICA_LAG_CHECK_SECONDS:
+        return lag
+    lock = _lag_locks.setdefault(bind_key, threading.Lock())
+    if not lock.acquire(blocking=False):
+        return lag
+
+    try:
+        lag = _measure_lag(engine)
+        metrics.gauge(f"db.{bind_key}.replication_lag_seconds", lag)
+    except Exception as e:
+        logger.warning(f"Replica {bind_key} lag check failed: {str(e)}")
+        metrics.increment(f"db.{bind_key}.lag_check_errors")
+        lag = None
+    finally:
+        _lag_checks[bind_key] = (time.monotonic(), lag)
+        lock.release()
+    return lag
+
+
+def _sticky_key(device_id=None, token=None):
+    return f"{STICKY_PRIMARY_KEY_PREFIX}device:{device_id}" if device_id else f"{STICKY_PRIMARY_KEY_PREFIX}token:{token}"
+
+
+def _request_sticky_keys():
+    """Get the sticky-primary keys for the device and voucher token in the current request."""
+    if not has_request_context():
+        return []
+    keys = []
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and data.get("device_id"):
+        keys.append(_sticky_key(device_id=data["device_id"]))
+    if request.view_args and request.view_args.get("token"):
+        keys.append(_sticky_key(token=request.view_args["token"]))
+    return keys
+
+
+def _is_sticky(keys):
+    """Check whether any of the keys was written in the last STICKY_PRIMARY_SECONDS."""
+    if any(_sticky_cache.get(key) for key in keys):
+        return True
+    if not keys:
+        return False
+    try:
+        return any(current_app.config['REDIS_CLIENT'].mget(keys))
+    except Exception as e:
+        logger.error(f"Error reading sticky primary keys: {str(e)}")
+        return False
+
+
+def stick_to_primary(device_id=None, token=None):
+    """Read a device's or voucher's data from the primary for a while once this transaction commits.
+
+    The device and token of the current request are added automatically when the transaction writes.
+    """
+    session = current_app.extensions["sqlalchemy"].session
+    session.info.setdefault(STICKY_KEYS, set()).add(_sticky_key(device_id, token))
+
+
+def choose_read_bind():
+    """Pick the replica bind key for a read-only request, or None to read from the primary.
+
+    Replicas are tried in turn and skipped while they lag more than REPLICA_MAX_LAG_SECONDS.
+    """
+    bind_keys = current_app.extensions.get("replica_binds")
+    if not bind_keys:
+        return None
+
+    if _is_sticky(_request_sticky_keys()):
+        metrics.increment("db.sticky_primary_reads")
+        return None
+
+    engines = current_app.extensions["sqlalchemy"].engines
+    start = next(_next_replica)
+    for offset in range(len(bind_keys)):
+        bind_key = bind_keys[(start + offset) % len(bind_keys)]
+        lag = _replica_lag(bind_key, engines[bind_key])
+        if lag is not None and lag <= REPLICA_MAX_LAG_SECONDS:
+            metrics.increment(f"db.{bind_key}.reads")
+            return bind_key
+
+    metrics.increment("db.replica_fallback_reads")
+    return None
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica chosen for a read_only view.
+
+    The replica is picked on the view's first query, so views answered from a cache skip the
+    sticky and lag checks. Flushes and INSERT/UPDATE/DELETE statements always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        bind_key = self.info.get(READ_BIND)
+        if (
+            bind is None
+            and bind_key
+            and not self._flushing
+            and not isinstance(clause, (Insert, Update, Delete))
+        ):
+            if bind_key is UNRESOLVED:
+                bind_key = self.info[READ_BIND] = choose_read_bind()
+            if bind_key:
+                return self._db.engines[bind_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_flush(session, flush_context):
+    session.info[WROTE] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _record_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[WROTE] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_sticky(session):
+    """Send the writer's next reads to the primary until the replicas have caught up."""
+    keys = session.info.pop(STICKY_KEYS, set())
+    if session.info.pop(WROTE, False):
+        keys.update(_request_sticky_keys())
+    if not keys or not current_app.extensions.get("replica_binds"):
+        return
+
+    try:
+        redis_client = current_app.config['REDIS_CLIENT']
+        for key in keys:
+            _sticky_cache.set(key, True)
+            redis_client.setex(key, STICKY_PRIMARY_SECONDS, 1)
+    except Exception as e:
+        logger.error(f"Error writing sticky primary keys: {str(e)}")
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _discard_sticky(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(STICKY_KEYS, None)
+        session.info.pop(WROTE, None)
+
+
+def read_only(view):
+    """Route a view's queries to a read replica when one is configured and up to date."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        session = current_app.extensions["sqlalchemy"].session
+        session.info[READ_BIND] = UNRESOLVED
+        try:
+            return view(*args, **kwargs)
+        finally:
+            session.info.pop(READ_BIND, None)
+
+    return wrapper
@@ -0,0 +1,33 @@
+import numpy as np
+from app.constants import EARTH_RADIUS_KM
+
+DISTANCE_MODE_HAVERSINE = "haversine"
+DISTANCE_MODE_GEODESIC = "geodesic"
+
+
+def haversine_distances(lat, long, lats, longs):
+    """Calculate great-circle distances in km from one point to arrays of points."""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlong = np.radians(np.asarray(longs, dtype=np.float64) - long)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlong / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def geodesic_distances(lat, long, lats, longs):
+    """Calculate exact ellipsoidal distances in km, one geopy solve per point."""
+    from geopy.distance import geodesic
+
+    return np.array(
+        [geodesic((lat, long), (lat2, long2)).km for lat2, long2 in zip(lats, longs)],
+        dtype=np.float64,
+    )
+
+
+def calculate_distances(lat, long, lats, longs, mode=DISTANCE_MODE_HAVERSINE):
+    """Calculate distances in km from one point to arrays of points using the given mode."""
+    if mode == DISTANCE_MODE_GEODESIC:
+        return geodesic_distances(lat, long, lats, longs)
+    return haversine_distances(lat, long, lats, longs)
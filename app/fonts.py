@@ -0,0 +1,58 @@
+import glob
+import html
+import logging
+import os
+import string
+from app.constants import FONT_SOURCE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Always kept so dynamic text such as store names and countdowns still renders in the font
+BASE_CHARACTERS = set(string.printable) - set(string.whitespace) | {" "}
+
+
+def used_characters(paths):
+    """Get every character that can appear in the given templates and scripts, plus printable ASCII."""
+    characters = set(BASE_CHARACTERS)
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            characters.update(html.unescape(f.read()))
+    return {character for character in characters if character.isprintable()}
+
+
+def subset_font(source, output, characters):
+    """Write a WOFF2 copy of a font containing only the given characters."""
+    from fontTools import subset
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+
+    font = subset.load_font(source, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text="".join(sorted(characters)))
+    subsetter.subset(font)
+    subset.save_font(font, output, options)
+
+
+def build_fonts(app):
+    """Subset every bundled font to the characters the templates and scripts use.
+
+    Each font.ttf gets a font.woff2 next to it. Returns {font file: (old bytes, new bytes)}.
+    """
+    sources = glob.glob(os.path.join(app.root_path, app.template_folder, "*.html"))
+    sources += glob.glob(os.path.join(app.static_folder, "js", "*.js"))
+    characters = used_characters(sources)
+
+    results = {}
+    for source in sorted(glob.glob(os.path.join(app.static_folder, "fonts", "*"))):
+        stem, ext = os.path.splitext(source)
+        if ext.lower() not in FONT_SOURCE_EXTENSIONS:
+            continue
+        output = f"{stem}.woff2"
+        subset_font(source, output, characters)
+        results[os.path.basename(source)] = (os.path.getsize(source), os.path.getsize(output))
+        logger.info(f"Subset {os.path.basename(source)} to {os.path.basename(output)}")
+    return results
@@ -0,0 +1,34 @@
+from flask import current_app, render_template
+from app.cache import LRUCache
+from app.constants import (
+    FRAGMENT_CACHE_MAX_ENTRIES,
+    FRAGMENT_CACHE_TTL_SECONDS,
+    VOUCHER_FRAGMENT_TTL_SECONDS
+)
+
+# Encoded {"html": ..., "is_home": ...} bodies for pages that only depend on their arguments
+page_fragments = LRUCache(FRAGMENT_CACHE_MAX_ENTRIES, ttl=FRAGMENT_CACHE_TTL_SECONDS)
+
+# Voucher cards also show Discount and Store columns. Those are edited from CLI commands and
+# scripts, outside the workers holding this cache, so an edit shows up once the entry expires,
+# at most VOUCHER_FRAGMENT_TTL_SECONDS later
+voucher_fragments = LRUCache(FRAGMENT_CACHE_MAX_ENTRIES, ttl=VOUCHER_FRAGMENT_TTL_SECONDS)
+
+
+def _encode(html, is_home):
+    """Encode a fragment payload once."""
+    return current_app.json.dumps({"html": html, "is_home": is_home}).encode()
+
+
+def fragment_response(cache, key, template, is_home, **context):
+    """Respond with a rendered template fragment, rendering it only on a cache miss.
+
+    key must cover every input the template output depends on. Nothing invalidates an entry early,
+    so rows edited after rendering are served stale until the cache's TTL expires: up to
+    FRAGMENT_CACHE_TTL_SECONDS for pages and VOUCHER_FRAGMENT_TTL_SECONDS for voucher cards.
+    """
+    body = cache.get(key)
+    if body is None:
+        body = _encode(render_template(template, **context), is_home)
+        cache.set(key, body)
+    return current_app.response_class(body, mimetype="application/json")
@@ -1,10 +1,15 @@
-from flask import Blueprint, render_template, request
+import gzip
+from flask import Blueprint, render_template, request, abort, current_app
+from app.database import read_only
 from app.helpers import render_redeem_page
 from app.models import Claimed
+from app.qr_codes import load_qr_code, generate_qr_code, get_qr_format, is_precompressed
+from app.constants import QR_CODE_MAX_AGE_SECONDS, HTTP_404_NOT_FOUND
 
 main = Blueprint('main', __name__)
 
 @main.route('/redeem/<token>')
+@read_only
 def redeem_voucher(token):
     """Redeem a voucher via token."""
     claimed = Claimed.query.filter_by(token=token, redeemed=False).first()
@@ -13,6 +18,36 @@ def redeem_voucher(token):
         return render_template('layout.html', initial_content=initial_content)
     return render_template('layout.html')
 
+@main.route('/qr/<token>.<ext>')
+def qr_code(token, ext):
+    """Serve the QR code image for a claimed voucher."""
+    qr_format = get_qr_format()
+    if ext != qr_format.extension:
+        abort(HTTP_404_NOT_FOUND)
+
+    qr_bytes = load_qr_code(token)
+    if not qr_bytes:
+        claimed = Claimed.query.filter_by(token=token, claimed=True, redeemed=False).first()
+        if not claimed:
+            abort(HTTP_404_NOT_FOUND)
+        qr_bytes = generate_qr_code(token)
+        if not qr_bytes:
+            abort(HTTP_404_NOT_FOUND)
+
+    response = current_app.response_class(mimetype=qr_format.mimetype)
+    response.vary.add('Accept-Encoding')
+    if is_precompressed():
+        if 'gzip' in request.accept_encodings:
+            response.content_encoding = 'gzip'
+        else:
+            qr_bytes = gzip.decompress(qr_bytes)
+    response.set_data(qr_bytes)
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.max_age = QR_CODE_MAX_AGE_SECONDS
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
 @main.route('/', defaults={'path': ''})
 @main.route('/<path:path>')
 def catch_all(path):
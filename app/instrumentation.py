@@ -0,0 +1,97 @@
+import hmac
+import random
+import time
+from flask import Blueprint, abort, before_render_template, current_app, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import metrics
+from app.constants import METRICS_COUNT_BUCKETS, HTTP_404_NOT_FOUND
+
+instrumentation = Blueprint("instrumentation", __name__)
+
+
+class QueryStats:
+    """Queries run by one sampled request."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def _query_stats():
+    return g.get("query_stats") if has_request_context() else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _query_stats() is not None:
+        context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _finish_query(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    stats = _query_stats()
+    if start is not None and stats is not None:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - start
+
+
+def _start_request():
+    """Sample the request for per-request timings and query counts."""
+    if random.random() < current_app.config["METRICS_SAMPLE_RATE"]:
+        g.query_stats = QueryStats()
+        g.request_start = time.perf_counter()
+        g.template_starts = []
+
+
+def _record_request(response):
+    endpoint = request.endpoint or "unmatched"
+    metrics.increment("http.requests", endpoint=endpoint, status=response.status_code)
+
+    stats = g.pop("query_stats", None)
+    if stats is not None:
+        metrics.observe("http.request_seconds", time.perf_counter() - g.request_start, endpoint=endpoint)
+        metrics.observe("db.queries_per_request", stats.count, buckets=METRICS_COUNT_BUCKETS, endpoint=endpoint)
+        metrics.observe("db.query_seconds_per_request", stats.seconds, endpoint=endpoint)
+    return response
+
+
+def _start_template(sender, template, context, **extra):
+    starts = g.get("template_starts") if has_request_context() else None
+    if starts is not None:
+        starts.append(time.perf_counter())
+
+
+def _finish_template(sender, template, context, **extra):
+    starts = g.get("template_starts") if has_request_context() else None
+    if starts:
+        metrics.observe("templates.render_seconds", time.perf_counter() - starts.pop(), template=template.name)
+
+
+@instrumentation.route("/metrics")
+def prometheus_metrics():
+    """Expose this worker's metrics for Prometheus.
+
+    Hidden unless METRICS_TOKEN is set, in which case the token is required, or METRICS_ENABLED is set.
+    """
+    token = current_app.config["METRICS_TOKEN"]
+    if token:
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            abort(HTTP_404_NOT_FOUND)
+    elif not current_app.config["METRICS_ENABLED"]:
+        abort(HTTP_404_NOT_FOUND)
+    return current_app.response_class(
+        metrics.render_prometheus(), mimetype="text/plain", headers={"Cache-Control": "no-store"}
+    )
+
+
+def init_instrumentation(app):
+    """Record request, query and template timings for a sample of requests and serve /metrics."""
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    before_render_template.connect(_start_template, app)
+    template_rendered.connect(_finish_template, app)
+    app.register_blueprint(instrumentation)
@@ -0,0 +1,250 @@
+import logging
+import redis
+from flask import current_app
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Discount
+from app.spatial_index import discount_index
+from app.catalog import invalidate_catalog_caches
+from app.constants import INVENTORY_KEY_PREFIX, INVENTORY_DIRTY_KEY
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] = counter, KEYS[2] = dirty set; ARGV[1] = seed from the discounts table, ARGV[2] = discount id
+RESERVE_SCRIPT = """
+local remaining = redis.call('GET', KEYS[1])
+if not remaining then
+    remaining = ARGV[1]
+end
+remaining = tonumber(remaining)
+if remaining <= 0 then
+    redis.call('SET', KEYS[1], remaining)
+    return -1
+end
+remaining = remaining - 1
+redis.call('SET', KEYS[1], remaining)
+redis.call('SADD', KEYS[2], ARGV[2])
+return remaining
+"""
+
+# Same keys and arguments as RESERVE_SCRIPT, plus ARGV[3] = amount to give back
+RELEASE_SCRIPT = """
+local remaining = redis.call('GET', KEYS[1])
+if not remaining then
+    remaining = ARGV[1]
+end
+remaining = tonumber(remaining) + tonumber(ARGV[3])
+redis.call('SET', KEYS[1], remaining)
+redis.call('SADD', KEYS[2], ARGV[2])
+return remaining
+"""
+
+
+def _redis_client():
+    """Get the Redis client if a real server is configured, otherwise None."""
+    client = current_app.config.get("REDIS_CLIENT")
+    return client if isinstance(client, redis.Redis) else None
+
+
+def _counter_key(discount_id):
+    return f"{INVENTORY_KEY_PREFIX}{discount_id}"
+
+
+def _pending(session):
+    """Get the inventory operations waiting on the session's transaction."""
+    return session.info.setdefault("inventory_pending", {"reserved": [], "released": []})
+
+
+def _redis_release(client, discount_id, seed, amount):
+    """Give inventory back to a Redis counter."""
+    return client.register_script(RELEASE_SCRIPT)(
+        keys=[_counter_key(discount_id), INVENTORY_DIRTY_KEY],
+        args=[seed, discount_id, amount],
+    )
+
+
+def reserve_discount(discount):
+    """Atomically take one unit of a discount's inventory.
+
+    With Redis the decrement happens in a Lua script, and the discounts row is
+    only touched to mark it unavailable when the last unit goes; the unit is
+    handed back automatically if the surrounding transaction does not commit. Without Redis a conditional UPDATE does the
+    decrement inside the current transaction.
+    """
+    if discount.unlimited_use:
+        return True
+
+    client = _redis_client()
+    if client:
+        remaining = client.register_script(RESERVE_SCRIPT)(
+            keys=[_counter_key(discount.id), INVENTORY_DIRTY_KEY],
+            args=[discount.remaining or 0, discount.id],
+        )
+        if remaining < 0:
+            discount_index.remove(discount.id)
+            return False
+        _pending(db.session)["reserved"].append((client, discount.id))
+        if remaining == 0:
+            # Don't wait for reconcile_inventory to hide a sold out discount
+            db.session.execute(update(Discount).where(Discount.id == discount.id).values(available=False))
+            db.session.info["availability_changed"] = True
+    else:
+        remaining = db.session.execute(
+            update(Discount)
+            .where(Discount.id == discount.id, Discount.remaining > 0)
+            .values(remaining=Discount.remaining - 1, available=Discount.remaining > 1)
+            .returning(Discount.remaining),
+            execution_options={"synchronize_session": "fetch"},
+        ).scalar()
+        if remaining is None:
+            discount_index.remove(discount.id)
+            return False
+        if remaining == 0:
+            db.session.info["availability_changed"] = True
+
+    discount_index.patch(discount, remaining=remaining)
+    return True
+
+
+def release_discount(discount, amount=1):
+    """Give inventory back to a discount, e.g. when a roll is replaced.
+
+    With Redis the refund is applied once the surrounding transaction commits.
+    """
+    if discount.unlimited_use:
+        return
+
+    client = _redis_client()
+    if client:
+        _pending(db.session)["released"].append(
+            (client, discount.id, discount.remaining or 0, amount, discount_index.entry_for(discount))
+        )
+    else:
+        remaining = db.session.execute(
+            update(Discount)
+            .where(Discount.id == discount.id)
+            .values(remaining=Discount.remaining + amount, available=True)
+            .returning(Discount.remaining),
+            execution_options={"synchronize_session": "fetch"},
+        ).scalar()
+        if remaining == amount:
+            db.session.info["availability_changed"] = True
+        discount_index.patch(discount, remaining=remaining)
+
+
+def _mark_available(discount_ids):
+    """Flag discounts whose Redis counter came back from zero as available again.
+
+    Runs after the releasing transaction has committed, so it uses its own connection.
+    """
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(update(Discount).where(Discount.id.in_(discount_ids)).values(available=True))
+    except Exception as e:
+        logger.error(f"Failed to mark discounts {discount_ids} available: {str(e)}")
+        return
+    invalidate_catalog_caches()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    """Invalidate catalog caches and apply deferred Redis refunds once the transaction commits."""
+    if session.info.pop("availability_changed", False):
+        invalidate_catalog_caches()
+
+    pending = session.info.pop("inventory_pending", None)
+    if not pending:
+        return
+    restocked = []
+    for client, discount_id, seed, amount, entry in pending["released"]:
+        try:
+            remaining = _redis_release(client, discount_id, seed, amount)
+            discount_index.put(entry._replace(remaining=remaining))
+            if remaining - amount <= 0 < remaining:
+                restocked.append(discount_id)
+        except redis.RedisError as e:
+            logger.error(f"Failed to release inventory for discount {discount_id}: {str(e)}")
+    if restocked:
+        _mark_available(restocked)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _undo_pending_reservations(session, transaction):
+    """Hand back Redis reservations made by a transaction that never committed."""
+    if transaction.parent is not None:
+        return
+    session.info.pop("availability_changed", None)
+    pending = session.info.pop("inventory_pending", None)
+    if not pending:
+        return
+    for client, discount_id in pending["reserved"]:
+        try:
+            _redis_release(client, discount_id, 0, 1)
+            discount_index.invalidate()
+        except redis.RedisError as e:
+            logger.error(f"Failed to undo reservation for discount {discount_id}: {str(e)}")
+
+
+def reconcile_inventory(batch_size):
+    """Write Redis counters back to the discounts table in batches.
+
+    Returns the number of discounts updated.
+    """
+    client = _redis_client()
+    if not client:
+        return 0
+
+    updated = 0
+    while True:
+        discount_ids = client.spop(INVENTORY_DIRTY_KEY, batch_size)
+        if not discount_ids:
+            return updated
+
+        values = client.mget([_counter_key(discount_id) for discount_id in discount_ids])
+        rows = [
+            {"id": int(discount_id), "remaining": int(remaining), "available": int(remaining) > 0}
+            for discount_id, remaining in zip(discount_ids, values)
+            if remaining is not None
+        ]
+        if not rows:
+            continue
+
+        try:
+            previously_available = dict(
+                db.session.query(Discount.id, Discount.available)
+                .filter(Discount.id.in_([row["id"] for row in rows]))
+                .all()
+            )
+            if any(previously_available.get(row["id"]) != row["available"] for row in rows):
+                db.session.info["availability_changed"] = True
+
+            db.session.execute(update(Discount), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            client.sadd(INVENTORY_DIRTY_KEY, *discount_ids)
+            raise
+
+        updated += len(rows)
+        logger.info(f"Reconciled inventory for {len(rows)} discounts")
+
+
+def reset_inventory(discount_id):
+    """Drop a discount's Redis counter so it is re-seeded from the discounts table.
+
+    Use after restocking a discount directly in the database. Also brings the
+    discount's available flag back in line with its restocked remaining count.
+    """
+    client = _redis_client()
+    if client:
+        client.delete(_counter_key(discount_id))
+
+    db.session.execute(
+        update(Discount)
+        .where(Discount.id == discount_id, Discount.unlimited_use.is_(False))
+        .values(available=Discount.remaining > 0)
+    )
+    db.session.info["availability_changed"] = True
+    db.session.commit()
+    discount_index.invalidate()
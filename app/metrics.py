@@ -0,0 +1,116 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from app.constants import METRICS_LATENCY_BUCKETS
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_timings = {}
+_gauges = {}
+
+
+def _key(name, labels):
+    """Get the storage key for a metric, with its labels in Prometheus form, e.g. name{endpoint="x"}."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in sorted(labels.items())) + "}"
+
+
+def increment(name, value=1, **labels):
+    """Increment a counter."""
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def gauge(name, value, **labels):
+    """Set a gauge to its current value."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, value, buckets=METRICS_LATENCY_BUCKETS, **labels):
+    """Record a duration, or any other value, in a histogram with the given upper bounds."""
+    key = _key(name, labels)
+    with _lock:
+        timing = _timings.get(key)
+        if timing is None:
+            timing = _timings[key] = {
+                "count": 0, "sum": 0.0, "max": 0.0, "bounds": buckets, "buckets": [0] * len(buckets)
+            }
+        timing["count"] += 1
+        timing["sum"] += value
+        timing["max"] = max(timing["max"], value)
+        index = bisect_left(timing["bounds"], value)
+        if index < len(timing["buckets"]):
+            timing["buckets"][index] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    """Time the wrapped block, or decorated function, and record it under the given name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def ratio(hits_name, misses_name):
+    """Get hits / (hits + misses) for a pair of counters."""
+    with _lock:
+        hits, misses = _counters[hits_name], _counters[misses_name]
+    return hits / (hits + misses) if hits + misses else None
+
+
+def snapshot():
+    """Get a copy of every counter and timing recorded by this process."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": {
+                name: {**timing, "buckets": list(timing["buckets"])} for name, timing in _timings.items()
+            },
+        }
+
+
+def _split_key(key):
+    """Split a storage key into a Prometheus metric name and its label string, without braces."""
+    name, _, labels = key.partition("{")
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name), labels.rstrip("}")
+
+
+def _sample(name, labels, value, extra_label=None):
+    labels = ",".join(label for label in (labels, extra_label) if label)
+    return f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+
+
+def render_prometheus():
+    """Render this process's metrics in the Prometheus text exposition format."""
+    data = snapshot()
+    families = defaultdict(list)
+    for key, value in data["counters"].items():
+        name, labels = _split_key(key)
+        families[(f"{name}_total", "counter")].append(_sample(f"{name}_total", labels, value))
+    for key, value in data["gauges"].items():
+        name, labels = _split_key(key)
+        families[(name, "gauge")].append(_sample(name, labels, value))
+    for key, timing in data["timings"].items():
+        name, labels = _split_key(key)
+        samples = families[(name, "histogram")]
+        cumulative = 0
+        for bound, count in zip(timing["bounds"], timing["buckets"]):
+            cumulative += count
+            samples.append(_sample(f"{name}_bucket", labels, cumulative, f'le="{bound}"'))
+        samples.append(_sample(f"{name}_bucket", labels, timing["count"], 'le="+Inf"'))
+        samples.append(_sample(f"{name}_sum", labels, timing["sum"]))
+        samples.append(_sample(f"{name}_count", labels, timing["count"]))
+
+    lines = []
+    for (name, kind), samples in sorted(families.items()):
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
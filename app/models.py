@@ -20,7 +20,10 @@ class User(db.Model):
     claimed_today = db.Column(db.Boolean, nullable=False, default=False)
     claimed_discounts = db.relationship("Claimed", backref="user", lazy=True)
 
-    __table_args__ = (db.Index("idx_device_id", "device_id"),)
+    __table_args__ = (
+        db.Index("idx_device_id", "device_id"),
+        db.Index("idx_timezone_id", "timezone", "id"),
+    )
 
     def to_dict(self):
         """Convert object to dictionary."""
@@ -33,6 +36,15 @@ class User(db.Model):
         }
 
 
+class DailyReset(db.Model):
+    """Progress of the daily rerolls/claimed_today reset for one timezone."""
+    __tablename__ = "daily_resets"
+    timezone = db.Column(db.String(MAX_STRING_LENGTH), primary_key=True)
+    reset_date = db.Column(db.Date, nullable=True)
+    in_progress_date = db.Column(db.Date, nullable=True)
+    last_user_id = db.Column(db.Integer, nullable=False, default=0)
+
+
 class Discount(db.Model):
     """Discount model."""
     __tablename__ = "discounts"
@@ -79,6 +91,17 @@ class Store(db.Model):
         }
 
 
+class PlaceLocation(db.Model):
+    """Coordinates of a Google Places place_id, kept so each place is only fetched once."""
+    __tablename__ = "place_locations"
+    place_id = db.Column(db.String(MAX_STRING_LENGTH), primary_key=True)
+    lat = db.Column(db.DECIMAL(9, 6), nullable=False)
+    long = db.Column(db.DECIMAL(9, 6), nullable=False)
+    fetched_at = db.Column(
+        db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+
 class Claimed(db.Model):
     """Claimed voucher model."""
     __tablename__ = "claimed"
@@ -0,0 +1,287 @@
+import json
+import logging
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app, request, g
+from sqlalchemy.exc import IntegrityError
+from app import db, metrics
+from app.cache import LRUCache
+from app.models import PlaceLocation
+from app.constants import (
+    PLACES_AUTOCOMPLETE_KEY_PREFIX,
+    PLACES_AUTOCOMPLETE_CACHE_SECONDS,
+    PLACES_AUTOCOMPLETE_MAX_RESULTS,
+    PLACES_MIN_PREFIX_LENGTH,
+    PLACES_POOL_SIZE,
+    PLACES_CONNECT_TIMEOUT,
+    PLACES_READ_TIMEOUT,
+    PLACE_LOCATION_CACHE_MAX_ENTRIES
+)
+
+logger = logging.getLogger(__name__)
+
+# Statuses whose predictions are a real answer rather than an upstream error
+CACHEABLE_STATUSES = ("OK", "ZERO_RESULTS")
+
+# (lat, lng) by place_id, in front of the place_locations table
+location_cache = LRUCache(PLACE_LOCATION_CACHE_MAX_ENTRIES)
+
+
+
+class DeferredUpstreamCall(Exception):
+    """Raised instead of calling the Places API when the ASGI entry point will make the call.
+
+    finish(payload) completes the lookup with the decoded upstream response.
+    """
+
+    def __init__(self, endpoint, params, finish):
+        super().__init__(endpoint)
+        self.endpoint = endpoint
+        self.params = params
+        self.finish = finish
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Get the process-local pooled HTTP session for the Places API, creating it after any fork."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=PLACES_POOL_SIZE, pool_maxsize=PLACES_POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session_pid = os.getpid()
+        return _session
+
+
+def places_url(endpoint):
+    """Build the URL for a Places API endpoint such as "autocomplete"."""
+    return f"{current_app.config['PLACES_API_BASE_URL'].rstrip('/')}/{endpoint}/json"
+
+
+def normalize_query(query):
+    """Lower-case a query and collapse its whitespace so equivalent inputs share a cache entry."""
+    return " ".join(query.lower().split())
+
+
+def _autocomplete_key(normalized):
+    return f"{PLACES_AUTOCOMPLETE_KEY_PREFIX}{normalized}"
+
+
+def _shorter_prefixes(normalized):
+    """Get the cacheable prefixes of a normalized query, longest first."""
+    prefixes = []
+    for length in range(len(normalized) - 1, PLACES_MIN_PREFIX_LENGTH - 1, -1):
+        prefix = normalized[:length].rstrip()
+        if prefix and (not prefixes or prefixes[-1] != prefix):
+            prefixes.append(prefix)
+    return prefixes
+
+
+def _matches(prediction, terms):
+    """Check whether every query term starts a word of a prediction's description."""
+    words = normalize_query(prediction.get("description", "").replace(",", " ")).split()
+    return all(any(word.startswith(term) for word in words) for term in terms)
+
+
+def get_cached_predictions(normalized):
+    """Get predictions for a query from the cache without calling the Places API.
+
+    A shorter prefix's predictions can answer a longer query when the shorter
+    list was not truncated, since every match for the longer query must then
+    already be in it.
+    """
+    prefixes = [normalized] + _shorter_prefixes(normalized)
+    try:
+        values = current_app.config['REDIS_CLIENT'].mget(
+            [_autocomplete_key(prefix) for prefix in prefixes]
+        )
+    except Exception as e:
+        logger.error(f"Error reading autocomplete cache: {str(e)}")
+        return None
+
+    if values[0] is not None:
+        metrics.increment("places.autocomplete_cache_hit")
+        return json.loads(values[0])
+
+    terms = normalized.split()
+    for value in values[1:]:
+        if value is None:
+            continue
+        predictions = json.loads(value)
+        if len(predictions) < PLACES_AUTOCOMPLETE_MAX_RESULTS:
+            metrics.increment("places.autocomplete_prefix_hit")
+            return [prediction for prediction in predictions if _matches(prediction, terms)]
+    return None
+
+
+def cache_predictions(normalized, payload):
+    """Cache an upstream autocomplete response if it is a real answer. Returns its predictions."""
+    predictions = payload.get("predictions", [])
+    if payload.get("status") not in CACHEABLE_STATUSES:
+        logger.warning(f"Not caching autocomplete response with status {payload.get('status')}")
+        return predictions
+    try:
+        current_app.config['REDIS_CLIENT'].setex(
+            _autocomplete_key(normalized),
+            PLACES_AUTOCOMPLETE_CACHE_SECONDS,
+            json.dumps(predictions),
+        )
+    except Exception as e:
+        logger.error(f"Error writing autocomplete cache: {str(e)}")
+    return predictions
+
+
+def autocomplete_params(normalized):
+    """Query parameters for an autocomplete request."""
+    return {
+        "input": normalized,
+        "key": current_app.config["GOOGLE_PLACES_API_KEY"],
+        "components": "country:au",
+    }
+
+
+def autocomplete(query):
+    """Get Places autocomplete predictions, from the cache where possible.
+
+    Raises requests.RequestException if the Places API has to be called and fails.
+    """
+    normalized = normalize_query(query)
+    predictions = get_cached_predictions(normalized)
+    if predictions is not None:
+        return predictions
+
+    metrics.increment("places.autocomplete_cache_miss")
+    if g.get("defer_places_upstream"):
+        raise DeferredUpstreamCall(
+            "autocomplete",
+            autocomplete_params(normalized),
+            lambda payload: cache_predictions(normalized, payload),
+        )
+
+    with metrics.timer("places.autocomplete_upstream_seconds"):
+        response = get_session().get(
+            places_url("autocomplete"),
+            params=autocomplete_params(normalized),
+            timeout=(PLACES_CONNECT_TIMEOUT, PLACES_READ_TIMEOUT),
+        )
+        response.raise_for_status()
+    return cache_predictions(normalized, response.json())
+
+
+def _lookup_location(place_id):
+    """Get a place's (lat, lng) and where it came from ("local" or "db"), or (None, None)."""
+    location = location_cache.get(place_id)
+    if location:
+        return location, "local"
+
+    row = db.session.get(PlaceLocation, place_id)
+    if not row:
+        return None, None
+    location = (float(row.lat), float(row.long))
+    location_cache.set(place_id, location)
+    return location, "db"
+
+
+def get_cached_location(place_id):
+    """Get a place's (lat, lng) from the local cache or the database, without calling the Places API."""
+    location, source = _lookup_location(place_id)
+    if location:
+        metrics.increment(f"places.location_{source}_hit")
+    return location
+
+
+def store_location(place_id, lat, lng):
+    """Persist a place's coordinates and cache them locally."""
+    # Match the precision of the place_locations columns
+    lat, lng = round(lat, 6), round(lng, 6)
+    location_cache.set(place_id, (lat, lng))
+    try:
+        db.session.add(PlaceLocation(place_id=place_id, lat=lat, long=lng))
+        db.session.commit()
+    except IntegrityError:
+        # Another request stored the same place first
+        db.session.rollback()
+    return lat, lng
+
+
+def details_params(place_id):
+    """Query parameters for a place details request."""
+    return {
+        "place_id": place_id,
+        "fields": "geometry",
+        "key": current_app.config["GOOGLE_PLACES_API_KEY"],
+    }
+
+
+def parse_location(payload):
+    """Get (lat, lng) out of a place details response."""
+    location = payload["result"]["geometry"]["location"]
+    return location["lat"], location["lng"]
+
+
+def fetch_location(place_id):
+    """Fetch a place's coordinates from the Places API.
+
+    Raises requests.RequestException if the call fails.
+    """
+    with metrics.timer("places.details_upstream_seconds"):
+        response = get_session().get(
+            places_url("details"),
+            params=details_params(place_id),
+            timeout=(PLACES_CONNECT_TIMEOUT, PLACES_READ_TIMEOUT),
+        )
+        response.raise_for_status()
+    return parse_location(response.json())
+
+
+def place_location(place_id):
+    """Get a place's (lat, lng), only calling the Places API the first time it is seen."""
+    location = get_cached_location(place_id)
+    if location:
+        return location
+
+    metrics.increment("places.location_cache_miss")
+    if g.get("defer_places_upstream"):
+        raise DeferredUpstreamCall(
+            "details",
+            details_params(place_id),
+            lambda payload: store_location(place_id, *parse_location(payload)),
+        )
+    return store_location(place_id, *fetch_location(place_id))
+
+
+def is_place_cached():
+    """Check whether the current place_details request can be answered without the Places API.
+
+    Used to exempt cached lookups from the place details rate limit.
+    """
+    data = request.get_json(silent=True) or {}
+    place_id = data.get("place_id")
+    return isinstance(place_id, str) and _lookup_location(place_id)[0] is not None
+
+
+def warm_locations(rows, fetch_missing=False):
+    """Bulk-load (place_id, lat, lng) rows, skipping places that are already stored.
+
+    Rows without coordinates are fetched from the Places API when
+    fetch_missing is set and skipped otherwise. Returns the number stored.
+    """
+    stored = 0
+    for place_id, lat, lng in rows:
+        if _lookup_location(place_id)[0]:
+            continue
+        if lat is None or lng is None:
+            if not fetch_missing:
+                continue
+            lat, lng = fetch_location(place_id)
+        store_location(place_id, lat, lng)
+        stored += 1
+    return stored
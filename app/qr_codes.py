@@ -0,0 +1,230 @@
+import os
+import gzip
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import sentry_sdk
+from flask import current_app, url_for
+from app import metrics
+from app.cache import LRUCache
+from app.constants import (
+    QR_CODE_EXPIRY_SECONDS,
+    QR_CODE_KEY_PREFIX,
+    QR_CACHE_MAX_ENTRIES,
+    QR_PREGENERATE_WORKERS,
+    QR_PREGENERATE_WAIT_SECONDS,
+    QR_BOX_SIZE,
+    QR_BORDER_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# Rendered QR code bytes by Redis key, in front of Redis
+qr_cache = LRUCache(QR_CACHE_MAX_ENTRIES)
+
+# Background render pool and the renders it has not finished yet, by token
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_in_flight = {}
+
+QRFormat = namedtuple("QRFormat", ["render", "mimetype", "extension", "compressible"])
+
+
+def _make_qr(qr_url, box_size):
+    """Build the QR matrix for a URL."""
+    # qrcode and PIL are imported on first use to keep worker startup fast
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=QR_BORDER_SIZE,
+    )
+    qr.add_data(qr_url)
+    qr.make(fit=True)
+    return qr
+
+
+def render_png(qr_url):
+    """Render a full-size RGB PNG."""
+    from qrcode.image.pil import PilImage
+
+    img = _make_qr(qr_url, QR_BOX_SIZE).make_image(
+        fill_color="black", back_color="#FFFFFF", image_factory=PilImage
+    )
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def render_png_1bit(qr_url):
+    """Render a 1-bit PNG with one pixel per module, scaled up by the browser."""
+    from qrcode.image.pil import PilImage
+
+    img = _make_qr(qr_url, 1).make_image(
+        fill_color="black", back_color="white", image_factory=PilImage
+    )
+    buffered = BytesIO()
+    img.save(buffered, format="PNG", optimize=True)
+    return buffered.getvalue()
+
+
+def render_svg(qr_url):
+    """Render an SVG with one path, drawing each horizontal run of dark modules as a rectangle."""
+    matrix = _make_qr(qr_url, 1).get_matrix()
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            path.append(f"M{start} {y}h{x - start}v1H{start}z")
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{"".join(path)}"/></svg>'
+    ).encode()
+
+
+QR_FORMATS = {
+    "png": QRFormat(render_png, "image/png", "png", False),
+    "png1bit": QRFormat(render_png_1bit, "image/png", "png", False),
+    "svg": QRFormat(render_svg, "image/svg+xml", "svg", True),
+}
+
+
+def get_qr_format():
+    """Get the QR format selected by QR_RENDERER."""
+    return QR_FORMATS[current_app.config['QR_RENDERER']]
+
+
+def is_precompressed():
+    """Check whether stored QR codes for the current format are gzip-compressed."""
+    return current_app.config['QR_PRECOMPRESS'] and get_qr_format().compressible
+
+
+def _qr_key(token):
+    return f"{QR_CODE_KEY_PREFIX}{current_app.config['QR_RENDERER']}:{token}"
+
+
+def store_qr_code(token, qr_bytes):
+    """Store rendered QR code bytes in Redis with 24-hour expiration."""
+    try:
+        qr_cache.set(_qr_key(token), qr_bytes)
+        redis_client = current_app.config['REDIS_BINARY_CLIENT']
+        redis_client.setex(_qr_key(token), QR_CODE_EXPIRY_SECONDS, qr_bytes)
+        return qr_bytes
+    except Exception as e:
+        logger.error(f"Error in store_qr_code: {str(e)}", exc_info=True)
+        sentry_sdk.capture_exception(e)
+        return None
+
+
+def get_qr_code(token):
+    """Retrieve rendered QR code bytes from the local cache or Redis."""
+    qr_bytes = qr_cache.get(_qr_key(token))
+    if qr_bytes:
+        return qr_bytes
+
+    try:
+        redis_client = current_app.config['REDIS_BINARY_CLIENT']
+        qr_bytes = redis_client.get(_qr_key(token))
+        if qr_bytes:
+            qr_cache.set(_qr_key(token), qr_bytes)
+        return qr_bytes
+    except Exception as e:
+        logger.error(f"Error in get_qr_code: {str(e)}", exc_info=True)
+        sentry_sdk.capture_exception(e)
+        return None
+
+
+def render_qr_code(qr_url, qr_format, precompress=False):
+    """Render a QR code for a URL in the given format, optionally gzip-compressed."""
+    with metrics.timer("qr.render_seconds"):
+        qr_bytes = qr_format.render(qr_url)
+        if precompress and qr_format.compressible:
+            qr_bytes = gzip.compress(qr_bytes, compresslevel=9, mtime=0)
+        return qr_bytes
+
+
+@metrics.timer("qr.generate_seconds")
+def generate_qr_code(token):
+    """Generate and store a QR code for a given token."""
+    try:
+        logger.info(f"Starting QR code generation for claimed discount: {token}")
+
+        qr_url = url_for('main.redeem_voucher', token=token, _external=True)
+        logger.debug(f"QR URL: {qr_url}")
+
+        return store_qr_code(token, render_qr_code(qr_url, get_qr_format(), is_precompressed()))
+    except Exception as e:
+        logger.error(f"Error in generate_qr_code: {str(e)}", exc_info=True)
+        sentry_sdk.capture_exception(e)
+        return None
+
+
+def _get_executor():
+    """Get the process-local QR render pool, creating it after any fork."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=QR_PREGENERATE_WORKERS, thread_name_prefix="qr-render"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _pregenerate(app, token, qr_url):
+    """Render and store a QR code from a pool thread."""
+    with app.app_context():
+        try:
+            return store_qr_code(token, render_qr_code(qr_url, get_qr_format(), is_precompressed()))
+        except Exception as e:
+            logger.error(f"Error pre-generating QR code for {token}: {str(e)}", exc_info=True)
+            sentry_sdk.capture_exception(e)
+            return None
+
+
+def pregenerate_qr_code(token):
+    """Render a voucher's QR code in the background so claiming it only reads the cache."""
+    try:
+        qr_url = url_for('main.redeem_voucher', token=token, _external=True)
+        app = current_app._get_current_object()
+        future = _get_executor().submit(_pregenerate, app, token, qr_url)
+        _in_flight[token] = future
+        future.add_done_callback(lambda _: _in_flight.pop(token, None))
+        metrics.increment("qr.pregenerate_submitted")
+    except Exception as e:
+        logger.error(f"Error scheduling QR code pre-generation: {str(e)}", exc_info=True)
+        sentry_sdk.capture_exception(e)
+
+
+def load_qr_code(token):
+    """Get a QR code, waiting on an in-flight pre-generation before rendering inline."""
+    qr_bytes = get_qr_code(token)
+    if qr_bytes:
+        metrics.increment("qr.cache_hit")
+        return qr_bytes
+
+    future = _in_flight.get(token)
+    if future:
+        try:
+            qr_bytes = future.result(timeout=QR_PREGENERATE_WAIT_SECONDS)
+        except Exception:
+            qr_bytes = None
+        if qr_bytes:
+            metrics.increment("qr.pregenerate_wait")
+            return qr_bytes
+
+    metrics.increment("qr.cache_miss")
+    return None
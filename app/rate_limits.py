@@ -0,0 +1,170 @@
+import threading
+import time
+from limits.storage import RedisStorage
+from limits.strategies import STRATEGIES, FixedWindowRateLimiter
+from limits.util import WindowStats
+from app import metrics
+from app.cache import LRUCache
+from app.constants import (
+    RATE_LIMIT_LOCAL_MAX_KEYS,
+    RATE_LIMIT_SYNC_INTERVAL_SECONDS,
+    RATE_LIMIT_UNSYNCED_SHARE
+)
+
+TIERED_STRATEGY = "tiered-fixed-window"
+
+# Adds each key's pending hits and returns its new count and milliseconds left in the window,
+# so one round trip flushes every key a worker has touched and no separate TTL read is needed
+BATCH_INCR_SCRIPT = """
+local result = {}
+for i, key in ipairs(KEYS) do
+    local count = redis.call('INCRBY', key, ARGV[i * 2 - 1])
+    local ttl = redis.call('PTTL', key)
+    if ttl < 0 then
+        ttl = ARGV[i * 2] * 1000
+        redis.call('PEXPIRE', key, ttl)
+    end
+    result[i * 2 - 1] = count
+    result[i * 2] = ttl
+end
+return result
+"""
+
+
+class _Window:
+    """A worker's view of one fixed window: the count last read from Redis plus hits not yet counted there."""
+
+    __slots__ = ("ends_at", "synced", "sending", "pending", "synced_at")
+
+    def __init__(self, ends_at):
+        self.ends_at = ends_at
+        self.synced = 0
+        self.sending = 0
+        self.pending = 0
+        self.synced_at = 0.0
+
+    def count(self):
+        return self.synced + self.sending + self.pending
+
+
+class TieredFixedWindowRateLimiter(FixedWindowRateLimiter):
+    """Fixed window limiter that decides in the worker and sends hits to shared storage in batches.
+
+    Every decision is made from the worker's last known global count plus its own unsent hits, so
+    clients over a limit are rejected without a round trip. A flush sends the hits of every key the
+    worker has touched in one script call, and reads back each key's count and window end. It runs
+    once a key's unsent hits reach RATE_LIMIT_UNSYNCED_SHARE of its remaining headroom, or when
+    RATE_LIMIT_SYNC_INTERVAL_SECONDS have passed since the last flush. Near a limit every hit is
+    flushed, so workers overshoot it by at most one small batch each.
+    """
+
+    def __init__(self, storage):
+        super().__init__(storage)
+        self._windows = LRUCache(RATE_LIMIT_LOCAL_MAX_KEYS)
+        self._dirty = {}
+        self._flushed_at = time.time()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._script = None
+        if isinstance(storage, RedisStorage):
+            self._script = storage.get_connection().register_script(BATCH_INCR_SCRIPT)
+
+    def _window(self, key, expiry, now):
+        """Return the key's current window, starting a new one if it has ended. Caller holds self._lock."""
+        window = self._windows.get(key)
+        if window is None or now >= window.ends_at:
+            window = _Window(now + expiry)
+            self._windows.set(key, window)
+            self._dirty.pop(key, None)
+        return window
+
+    def _send(self, batch):
+        """Add each (key, amount, expiry) to storage and return the new (count, seconds left) per key."""
+        if self._script is None:
+            results = []
+            for key, amount, expiry in batch:
+                count = self.storage.incr(key, expiry, amount=amount)
+                results.append((count, self.storage.get_expiry(key) - time.time()))
+            return results
+
+        keys = [self.storage.prefixed_key(key) for key, _, _ in batch]
+        args = [value for _, amount, expiry in batch for value in (amount, expiry)]
+        reply = self._script(keys=keys, args=args)
+        return [(int(reply[i]), int(reply[i + 1]) / 1000) for i in range(0, len(reply), 2)]
+
+    def _flush(self):
+        """Send every window's pending hits to storage in one call and refresh their global counts."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._dirty = self._dirty, {}
+                self._flushed_at = time.time()
+                for window, _ in batch.values():
+                    window.sending, window.pending = window.pending, 0
+            if not batch:
+                return
+
+            try:
+                results = self._send([(key, window.sending, expiry) for key, (window, expiry) in batch.items()])
+            except Exception:
+                with self._lock:
+                    for key, (window, expiry) in batch.items():
+                        window.pending += window.sending
+                        window.sending = 0
+                        self._dirty.setdefault(key, (window, expiry))
+                raise
+
+            now = time.time()
+            with self._lock:
+                for (window, _), (count, remaining) in zip(batch.values(), results):
+                    window.synced = count
+                    window.sending = 0
+                    window.ends_at = now + remaining
+                    window.synced_at = now
+        metrics.increment("rate_limit.syncs")
+        metrics.increment("rate_limit.synced_keys", len(batch))
+
+    def hit(self, item, *identifiers, cost=1):
+        key = item.key_for(*identifiers)
+        expiry = item.get_expiry()
+        now = time.time()
+        with self._lock:
+            window = self._window(key, expiry, now)
+            if window.count() + cost > item.amount:
+                metrics.increment("rate_limit.local_rejections")
+                return False
+
+            window.pending += cost
+            self._dirty[key] = (window, expiry)
+            flush = (
+                window.pending >= max(1, int((item.amount - window.synced) * RATE_LIMIT_UNSYNCED_SHARE))
+                or now - self._flushed_at >= RATE_LIMIT_SYNC_INTERVAL_SECONDS
+            )
+        if not flush:
+            metrics.increment("rate_limit.local_hits")
+            return True
+
+        self._flush()
+        with self._lock:
+            return window.count() <= item.amount
+
+    def test(self, item, *identifiers, cost=1):
+        window = self._windows.get(item.key_for(*identifiers))
+        if window is None or time.time() >= window.ends_at:
+            return super().test(item, *identifiers, cost=cost)
+        return window.count() < item.amount - cost + 1
+
+    def get_window_stats(self, item, *identifiers):
+        window = self._windows.get(item.key_for(*identifiers))
+        if window is None or time.time() >= window.ends_at:
+            return super().get_window_stats(item, *identifiers)
+        return WindowStats(window.ends_at, max(0, item.amount - window.count()))
+
+    def clear(self, item, *identifiers):
+        key = item.key_for(*identifiers)
+        with self._lock:
+            self._windows.delete(key)
+            self._dirty.pop(key, None)
+        super().clear(item, *identifiers)
+
+
+STRATEGIES.setdefault(TIERED_STRATEGY, TieredFixedWindowRateLimiter)
@@ -0,0 +1,174 @@
+import math
+import threading
+import time
+import logging
+from collections import namedtuple
+from app import db
+from app.models import Discount, Store
+from app.constants import (
+    EARTH_DEGREE_KM,
+    LATITUDE_MAX,
+    LONGITUDE_MAX,
+    DISCOUNT_INDEX_TTL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+IndexedDiscount = namedtuple(
+    "IndexedDiscount", ["id", "lat", "long", "category", "unlimited_use", "remaining"]
+)
+
+
+def _is_available(unlimited_use, remaining):
+    """Check whether a discount still has inventory."""
+    return unlimited_use or (remaining is not None and remaining > 0)
+
+
+class DiscountIndex:
+    """Process-local grid index of available discounts keyed by store coordinates.
+
+    Discounts are bucketed into square cells roughly VOUCHER_DISTANCE wide, so a
+    lookup only has to inspect the handful of cells around the user instead of
+    querying the database.
+    """
+
+    def __init__(self, ttl=DISCOUNT_INDEX_TTL_SECONDS):
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._cell_size = None
+        self._cells = {}
+        self._entries = {}
+        self._built_at = None
+
+    def _cell(self, lat, long):
+        """Get the grid cell for a coordinate."""
+        return (math.floor(lat / self._cell_size), math.floor(long / self._cell_size))
+
+    def _add(self, entry):
+        """Add an entry to the grid. Caller must hold the lock."""
+        self._entries[entry.id] = entry
+        self._cells.setdefault(self._cell(entry.lat, entry.long), {})[entry.id] = entry
+
+    def _remove(self, discount_id):
+        """Remove an entry from the grid. Caller must hold the lock."""
+        entry = self._entries.pop(discount_id, None)
+        if entry:
+            cell = self._cells.get(self._cell(entry.lat, entry.long))
+            if cell is not None:
+                cell.pop(discount_id, None)
+                if not cell:
+                    del self._cells[self._cell(entry.lat, entry.long)]
+
+    def build(self, rows, max_distance):
+        """Rebuild the index from (id, category, unlimited_use, remaining, lat, long) rows."""
+        with self._lock:
+            self._cell_size = max_distance / EARTH_DEGREE_KM
+            self._cells = {}
+            self._entries = {}
+            for discount_id, category, unlimited_use, remaining, lat, long in rows:
+                if _is_available(unlimited_use, remaining):
+                    self._add(IndexedDiscount(
+                        discount_id, float(lat), float(long), category, unlimited_use, remaining
+                    ))
+            self._built_at = time.monotonic()
+        logger.info(f"Discount index built with {len(self._entries)} discounts")
+
+    def is_stale(self):
+        """Check whether the index needs to be rebuilt."""
+        return self._built_at is None or time.monotonic() - self._built_at > self._ttl
+
+    def ensure_fresh(self, max_distance):
+        """Rebuild the index from the database if it is missing or older than the TTL."""
+        if self.is_stale():
+            self.build(load_discount_rows(), max_distance)
+
+    def invalidate(self):
+        """Force a rebuild on the next lookup."""
+        self._built_at = None
+
+    def entry_for(self, discount, remaining=None):
+        """Build an index entry for a discount row."""
+        store = discount.store
+        return IndexedDiscount(
+            discount.id,
+            float(store.lat),
+            float(store.long),
+            discount.category,
+            discount.unlimited_use,
+            discount.remaining if remaining is None else remaining,
+        )
+
+    def put(self, entry):
+        """Insert or replace an entry, dropping it if it has no inventory left."""
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove(entry.id)
+            if _is_available(entry.unlimited_use, entry.remaining):
+                self._add(entry)
+
+    def patch(self, discount, remaining=None):
+        """Update a single discount after its remaining count changed."""
+        if self._built_at is None:
+            return
+        if not discount.available and remaining is None:
+            self.remove(discount.id)
+        else:
+            self.put(self.entry_for(discount, remaining))
+
+    def remove(self, discount_id):
+        """Drop a discount from the index."""
+        with self._lock:
+            self._remove(discount_id)
+
+    def nearby(self, user_lat, user_long, max_distance, exclude=(), category=None):
+        """Get indexed discounts inside the bounding box around the user's location."""
+        lat_change = max_distance / EARTH_DEGREE_KM
+        if abs(user_lat) >= LATITUDE_MAX:
+            long_change = LONGITUDE_MAX
+        else:
+            long_change = abs(max_distance / (EARTH_DEGREE_KM * math.cos(math.radians(user_lat))))
+
+        with self._lock:
+            if long_change >= LONGITUDE_MAX:
+                candidates = list(self._entries.values())
+            else:
+                min_row, min_col = self._cell(user_lat - lat_change, user_long - long_change)
+                max_row, max_col = self._cell(user_lat + lat_change, user_long + long_change)
+                candidates = [
+                    entry
+                    for row in range(min_row, max_row + 1)
+                    for col in range(min_col, max_col + 1)
+                    for entry in self._cells.get((row, col), {}).values()
+                ]
+
+        return [
+            entry for entry in candidates
+            if entry.id not in exclude
+            and (not category or entry.category == category)
+            and abs(entry.lat - user_lat) <= lat_change
+            and abs(entry.long - user_long) <= long_change
+        ]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def load_discount_rows():
+    """Load the rows needed to build the discount index in a single query."""
+    return (
+        db.session.query(
+            Discount.id,
+            Discount.category,
+            Discount.unlimited_use,
+            Discount.remaining,
+            Store.lat,
+            Store.long,
+        )
+        .join(Store, Discount.store_id == Store.id)
+        .filter(Discount.available == True)
+        .all()
+    )
+
+
+discount_index = DiscountIndex()
@@ -51,8 +51,50 @@ window.addEventListener('click', function (event) {
 });
 
 
-export function loadContent(url, data = {}) {
+const MAX_THROTTLE_RETRIES = 3;
+const MAX_BACKOFF_MS = 30000;
+let throttledUntil = 0;
+
+function backoffDelay(xhr, attempt) {
+    const retryAfter = parseInt(xhr.getResponseHeader('Retry-After'), 10);
+    const delay = Number.isNaN(retryAfter) ? 1000 * 2 ** attempt : retryAfter * 1000;
+    return Math.min(delay, MAX_BACKOFF_MS) + Math.random() * 1000;
+}
+
+// $.ajax that backs off when the server answers 429. Throttled requests never reached the
+// view, so they are safe to send again. Pass retry: false for requests that can be dropped.
+export function throttledAjax(options, attempt = 0) {
+    const { retry = true, error, ...settings } = options;
+    const wait = throttledUntil - Date.now();
+    if (wait > 0) {
+        if (retry) {
+            setTimeout(() => throttledAjax(options, attempt), wait);
+        } else if (error) {
+            error({ status: 429 }, 'error', 'Too Many Requests');
+        }
+        return;
+    }
+
     $.ajax({
+        ...settings,
+        error: function (xhr, status, err) {
+            if (xhr.status === 429) {
+                const delay = backoffDelay(xhr, attempt);
+                throttledUntil = Date.now() + delay;
+                if (retry && attempt < MAX_THROTTLE_RETRIES) {
+                    setTimeout(() => throttledAjax(options, attempt + 1), delay);
+                    return;
+                }
+            }
+            if (error) {
+                error(xhr, status, err);
+            }
+        }
+    });
+}
+
+export function loadContent(url, data = {}) {
+    throttledAjax({
         url: url,
         type: 'POST',
         contentType: 'application/json',
@@ -65,9 +107,13 @@ export function loadContent(url, data = {}) {
             $('#content').html(response.html);
             updateHeader(response.is_home);
         },
-        error: function () {
+        error: function (xhr) {
+            if (xhr.responseJSON && xhr.responseJSON.message) {
+                showModal(xhr.responseJSON.message);
+                return;
+            }
             $('#content').html('<p>Error loading content.</p>');
-            updateHeader(response.is_home);
+            updateHeader(false);
         }
     });
 }
@@ -1,4 +1,4 @@
-import { getLocation, loadContent, getDeviceId, showModal } from './app.js';
+import { getLocation, loadContent, getDeviceId, showModal, throttledAjax } from './app.js';
 
 $(document).ready(function () {
     let selectedLocation = null;
@@ -8,7 +8,7 @@ $(document).ready(function () {
 
     $('#see-stores-link').on('click', function(e) {
         e.preventDefault();
-        $.ajax({
+        throttledAjax({
             url: '/api/get_stores',
             method: 'GET',
             success: function(data) {
@@ -48,7 +48,7 @@ $(document).ready(function () {
 
     $locationInput.autocomplete({
         source: function (request, response) {
-            $.ajax({
+            throttledAjax({
                 url: '/api/autocomplete',
                 method: 'POST',
                 data: JSON.stringify({
@@ -56,11 +56,15 @@ $(document).ready(function () {
                     components: 'country:au'
                 }),
                 contentType: 'application/json',
+                retry: false,
                 success: function (data) {
                     response(data.map(item => ({
                         label: item.description,
                         value: item.place_id
                     })));
+                },
+                error: function () {
+                    response([]);
                 }
             });
         },
@@ -69,7 +73,7 @@ $(document).ready(function () {
             event.preventDefault();
             $(this).val(ui.item.label);
 
-            $.ajax({
+            throttledAjax({
                 url: '/api/place_details',
                 method: 'POST',
                 data: JSON.stringify({ place_id: ui.item.value }),
@@ -1,11 +1,11 @@
-import {showModal } from './app.js';
+import {showModal, throttledAjax } from './app.js';
 
 
 $(document).ready(function() {
     const url = new URL(window.location.href);
     const token = url.pathname.split('/').pop();
     $('#redeem-btn').on('click', function() {
-        $.ajax({
+        throttledAjax({
             url: `/api/redeem/${token}`,
             type: 'POST',
             success: function(response) {
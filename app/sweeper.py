@@ -0,0 +1,158 @@
+import logging
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import and_, or_, update
+from app import db, metrics
+from app.models import User, Discount, Claimed
+from app.inventory import release_discount
+from app.user_state import invalidate_user_state
+from app.constants import VOUCHER_EXPIRY_HOURS, SWEEPER_WATERMARK_KEY
+
+logger = logging.getLogger(__name__)
+
+SweepResult = namedtuple("SweepResult", ["scanned", "expired", "abandoned", "refunded", "seconds"])
+
+
+def _load_watermark():
+    """Get the (roll_time, id) every earlier row has been swept past, if any."""
+    try:
+        value = current_app.config['REDIS_CLIENT'].get(SWEEPER_WATERMARK_KEY)
+    except Exception as e:
+        logger.error(f"Error reading sweeper watermark: {str(e)}")
+        return None
+    if not value:
+        return None
+    roll_time, claimed_id = value.rsplit("|", 1)
+    return datetime.fromisoformat(roll_time), int(claimed_id)
+
+
+def _store_watermark(watermark):
+    try:
+        roll_time, claimed_id = watermark
+        current_app.config['REDIS_CLIENT'].set(
+            SWEEPER_WATERMARK_KEY, f"{roll_time.isoformat()}|{claimed_id}"
+        )
+    except Exception as e:
+        logger.error(f"Error writing sweeper watermark: {str(e)}")
+
+
+def _after(cursor):
+    """Keyset condition for rows strictly after a (roll_time, id) cursor."""
+    roll_time, claimed_id = cursor
+    return or_(
+        Claimed.roll_time > roll_time,
+        and_(Claimed.roll_time == roll_time, Claimed.id > claimed_id),
+    )
+
+
+def _sweep_batch(rows, cutoff):
+    """Invalidate the expired rows of one batch and refund abandoned rolls.
+
+    Returns (expired, abandoned, refunded, index of the first row left valid or None).
+    """
+    abandoned_ids = [row.id for row in rows if row.claimed is None]
+    expired_ids = [row.id for row in rows if row.claimed and row.claim_time < cutoff]
+    pending = next(
+        (index for index, row in enumerate(rows) if row.claimed and row.claim_time >= cutoff), None
+    )
+
+    # The WHERE clauses re-check each row so a concurrent claim or redeem wins
+    abandoned = db.session.execute(
+        update(Claimed)
+        .where(Claimed.id.in_(abandoned_ids), Claimed.valid == True, Claimed.claimed.is_(None))
+        .values(valid=False, claimed=False)
+        .returning(Claimed.claimed_by, Claimed.discount_id),
+        execution_options={"synchronize_session": False},
+    ).all() if abandoned_ids else []
+    expired = db.session.execute(
+        update(Claimed)
+        .where(
+            Claimed.id.in_(expired_ids),
+            Claimed.valid == True,
+            Claimed.redeemed == False,
+            Claimed.claim_time < cutoff,
+        )
+        .values(valid=False)
+        .returning(Claimed.claimed_by),
+        execution_options={"synchronize_session": False},
+    ).all() if expired_ids else []
+
+    refunds = Counter(discount_id for _, discount_id in abandoned)
+    if refunds:
+        for discount in Discount.query.filter(Discount.id.in_(refunds)).all():
+            release_discount(discount, amount=refunds[discount.id])
+
+    user_ids = {row[0] for row in abandoned} | {row[0] for row in expired}
+    device_ids = [
+        device_id for (device_id,) in
+        db.session.query(User.device_id).filter(User.id.in_(user_ids))
+    ] if user_ids else []
+
+    db.session.commit()
+    invalidate_user_state(*device_ids)
+    return len(expired), len(abandoned), sum(refunds.values()), pending
+
+
+def sweep_expired_vouchers(batch_size, now=None):
+    """Invalidate vouchers older than VOUCHER_EXPIRY_HOURS and refund abandoned rolls.
+
+    Rows are walked in (roll_time, id) order over idx_roll_time, starting from
+    a watermark kept in Redis, so each run only reads rows rolled since the
+    oldest voucher that was still live last time.
+    """
+    started = time.perf_counter()
+    now = now or datetime.now(timezone.utc)
+    cutoff = now.replace(tzinfo=None) - timedelta(hours=VOUCHER_EXPIRY_HOURS)
+
+    cursor = _load_watermark()
+    settled = cursor
+    found_pending = False
+    scanned = expired = abandoned = refunded = 0
+
+    while True:
+        query = (
+            db.session.query(
+                Claimed.id, Claimed.roll_time, Claimed.claimed, Claimed.claim_time
+            )
+            .filter(Claimed.roll_time < cutoff, Claimed.valid == True)
+        )
+        if cursor:
+            query = query.filter(_after(cursor))
+        rows = query.order_by(Claimed.roll_time, Claimed.id).limit(batch_size).all()
+        if not rows:
+            break
+
+        with metrics.timer("sweeper.batch_seconds"):
+            try:
+                batch_expired, batch_abandoned, batch_refunded, pending = _sweep_batch(rows, cutoff)
+            except Exception:
+                db.session.rollback()
+                raise
+
+        scanned += len(rows)
+        expired += batch_expired
+        abandoned += batch_abandoned
+        refunded += batch_refunded
+        if not found_pending:
+            # Everything before the first still-live voucher is finished for good
+            if pending is None:
+                settled = (rows[-1].roll_time, rows[-1].id)
+            elif pending:
+                settled = (rows[pending - 1].roll_time, rows[pending - 1].id)
+            found_pending = pending is not None
+            if settled:
+                _store_watermark(settled)
+        cursor = (rows[-1].roll_time, rows[-1].id)
+
+    metrics.increment("sweeper.rows_scanned", scanned)
+    metrics.increment("sweeper.expired", expired)
+    metrics.increment("sweeper.abandoned", abandoned)
+    metrics.increment("sweeper.refunded", refunded)
+    seconds = time.perf_counter() - started
+    logger.info(
+        f"Swept {scanned} vouchers in {seconds:.2f}s: {expired} expired, "
+        f"{abandoned} abandoned, {refunded} units refunded"
+    )
+    return SweepResult(scanned, expired, abandoned, refunded, seconds)
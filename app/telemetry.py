@@ -0,0 +1,261 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+import sentry_sdk
+from flask import has_request_context, request
+from sentry_sdk.integrations.flask import FlaskIntegration
+from sentry_sdk.transport import Transport
+from werkzeug.exceptions import HTTPException
+from app import metrics
+from app.cache import LRUCache
+from app.constants import (
+    LOG_QUEUE_MAX_RECORDS,
+    LOCAL_SINK_MAX_ITEMS,
+    TRACE_SAMPLE_RATES,
+    VALIDATION_WARNING_DEDUPE_SECONDS,
+    VALIDATION_WARNING_DEDUPE_MAX_ENTRIES
+)
+
+# Validation warnings already sent to Sentry, by endpoint and errors
+_reported_warnings = LRUCache(VALIDATION_WARNING_DEDUPE_MAX_ENTRIES, ttl=VALIDATION_WARNING_DEDUPE_SECONDS)
+
+
+def parse_sample_rates(value):
+    """Parse "endpoint=rate,endpoint=rate" into a dict of rates."""
+    rates = {}
+    for item in (value or "").split(","):
+        endpoint, _, rate = item.partition("=")
+        if endpoint.strip() and rate.strip():
+            rates[endpoint.strip()] = float(rate)
+    return rates
+
+
+def make_traces_sampler(app):
+    """Build a Sentry traces_sampler that picks the sample rate by the request's endpoint.
+
+    Rates come from TRACE_SAMPLE_RATES, overridden by SENTRY_ENDPOINT_SAMPLE_RATES. Other endpoints
+    use SENTRY_TRACES_SAMPLE_RATE.
+    """
+    rates = {**TRACE_SAMPLE_RATES, **parse_sample_rates(app.config["SENTRY_ENDPOINT_SAMPLE_RATES"])}
+    default_rate = app.config["SENTRY_TRACES_SAMPLE_RATE"]
+
+    def traces_sampler(sampling_context):
+        if sampling_context.get("parent_sampled") is not None:
+            return sampling_context["parent_sampled"]
+        environ = sampling_context.get("wsgi_environ")
+        if environ is None:
+            return default_rate
+        try:
+            endpoint, _ = app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return default_rate
+        return rates.get(endpoint, default_rate)
+
+    return traces_sampler
+
+
+def report_validation_errors(errors):
+    """Send a validation warning to Sentry, once per endpoint and set of errors per dedupe window."""
+    endpoint = request.endpoint if has_request_context() else None
+    key = (endpoint, str(errors))
+    if _reported_warnings.get(key):
+        metrics.increment("telemetry.validation_warnings_suppressed", endpoint=endpoint)
+        return
+    _reported_warnings.set(key, True)
+    sentry_sdk.capture_message(errors, level="warning")
+
+
+class LogShipper:
+    """Hands log records to slow handlers, such as CloudWatch, on a background thread.
+
+    The queue is bounded; records that do not fit are dropped and counted in
+    logging.dropped_records rather than blocking the request.
+    """
+
+    def __init__(self, handlers, max_records=LOG_QUEUE_MAX_RECORDS):
+        self.handlers = handlers
+        self.max_records = max_records
+        self.queue = None
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start the listener thread, and a fresh queue for it in each forked worker."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self.queue = queue.Queue(maxsize=self.max_records)
+                self._listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+                self._listener.start()
+                self._pid = os.getpid()
+                atexit.register(self.stop)
+
+    def stop(self):
+        """Flush queued records and stop the listener thread."""
+        if self._listener is not None and self._pid == os.getpid():
+            try:
+                self._listener.stop()
+            except queue.Full:
+                pass
+
+    def handler(self):
+        """Get a logging handler that feeds this shipper."""
+        return DroppingQueueHandler(self)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of reporting an error."""
+
+    def __init__(self, shipper):
+        super().__init__(None)
+        self.shipper = shipper
+
+    def enqueue(self, record):
+        self.shipper.ensure_started()
+        try:
+            self.shipper.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("logging.dropped_records", level=record.levelname)
+
+
+class DeferredHandler(logging.Handler):
+    """Builds the wrapped handler on its first record, on the log shipping thread.
+
+    The handler is rebuilt in each forked worker, so clients and threads created in the
+    gunicorn master are never shared.
+    """
+
+    def __init__(self, factory):
+        super().__init__()
+        self._factory = factory
+        self._handler = None
+        self._pid = None
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._handler = self._factory()
+            self._pid = os.getpid()
+        self._handler.handle(record)
+
+    def close(self):
+        if self._handler is not None and self._pid == os.getpid():
+            self._handler.close()
+        super().close()
+
+
+class LocalLogHandler(logging.Handler):
+    """Keeps the most recent log records in memory."""
+
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class LocalTransport(Transport):
+    """Sentry transport that keeps the most recent events and transactions in memory."""
+
+    def __init__(self, events):
+        super().__init__()
+        self.events = events
+
+    def capture_envelope(self, envelope):
+        for item in envelope.items:
+            if item.type in ("event", "transaction"):
+                self.events.append(item.payload.json)
+
+
+class LocalSink:
+    """In-memory stand-in for CloudWatch and Sentry, for tests and local runs."""
+
+    def __init__(self, max_items=LOCAL_SINK_MAX_ITEMS):
+        self.records = deque(maxlen=max_items)
+        self.events = deque(maxlen=max_items)
+        self.handler = LocalLogHandler(self.records)
+        self.transport = LocalTransport(self.events)
+
+
+def ship_logs(app, handlers):
+    """Send app and werkzeug logs to the given handlers through a LogShipper."""
+    shipper = LogShipper(handlers)
+    queue_handler = shipper.handler()
+    app.logger.addHandler(queue_handler)
+    logging.getLogger("werkzeug").addHandler(queue_handler)
+    app.logger.setLevel(logging.INFO)
+    app.extensions["log_shipper"] = shipper
+    return shipper
+
+
+def _cloudwatch_handler(stream_name):
+    """Create the CloudWatch handler, falling back to stderr if AWS is unavailable."""
+    import watchtower
+    from botocore.exceptions import ClientError, NoCredentialsError
+
+    try:
+        return watchtower.CloudWatchLogHandler(
+            log_group="/ec2/myapp",
+            stream_name=stream_name,
+        )
+    except (ClientError, NoCredentialsError, Exception) as e:
+        # Catch ALL AWS errors so app works locally without creds. Written to stderr directly,
+        # since the app logger routes through the log shipper this handler belongs to
+        sys.stderr.write(f"Warning: CloudWatch logging disabled: {e}\n")
+        return logging.NullHandler()
+
+
+def setup_cloudwatch_logging(app):
+    """Set up CloudWatch logging, plus a stream handler for instance logs.
+
+    The instance ID is looked up once, in the process that creates the app; the CloudWatch
+    client is created on the log shipping thread of each worker.
+    """
+    import boto3
+
+    # Generate a stream name based on date and EC2 instance ID
+    date_str = datetime.utcnow().strftime("%Y-%m-%d")
+    try:
+        # Safe fetch for instance ID
+        instance_id = boto3.utils.InstanceMetadataFetcher().get_instance_identity()[
+            "instanceId"
+        ]
+    except Exception:
+        instance_id = "unknown"
+
+    stream_name = f"{date_str}-{instance_id}"
+    ship_logs(app, [logging.StreamHandler(), DeferredHandler(lambda: _cloudwatch_handler(stream_name))])
+    app.logger.info(f"App startup on instance {instance_id}")
+
+
+def init_telemetry(app):
+    """Set up Sentry and log shipping for TELEMETRY_SINK.
+
+    "local" keeps logs and Sentry events in memory, in app.extensions["telemetry_sink"]; otherwise
+    they go to CloudWatch and Sentry outside debug mode.
+    """
+    if app.config["TELEMETRY_SINK"] == "local":
+        sink = LocalSink()
+        app.extensions["telemetry_sink"] = sink
+        sentry_options = {"transport": sink.transport}
+        ship_logs(app, [sink.handler])
+    elif not app.debug:
+        sentry_options = {"dsn": app.config["SENTRY_DSN"]}
+        setup_cloudwatch_logging(app)
+    else:
+        return
+
+    sentry_sdk.init(
+        integrations=[FlaskIntegration(transaction_style="url")],
+        traces_sampler=make_traces_sampler(app),
+        environment=app.config["FLASK_ENV"],
+        **sentry_options,
+    )
@@ -0,0 +1,34 @@
+import logging
+import math
+import time
+from flask import request
+from app import metrics
+from app.helpers import static_response
+from app.constants import HTTP_429_TOO_MANY_REQUESTS, THROTTLE_MAX_RETRY_AFTER_SECONDS
+
+
+def retry_after(error):
+    """Get the seconds until the breached limit's window resets, without touching storage where possible."""
+    from app import limiter
+
+    request_limit = limiter.current_limit if limiter else None
+    if request_limit is not None:
+        seconds = math.ceil(request_limit.reset_at - time.time())
+    else:
+        seconds = error.limit.limit.get_expiry()
+    return min(max(seconds, 1), THROTTLE_MAX_RETRY_AFTER_SECONDS)
+
+
+def throttled_response(error):
+    """Answer a rate limited request with the pre-encoded 429 body and a Retry-After header."""
+    metrics.increment("throttle.rejected", endpoint=request.endpoint)
+    response = static_response("throttled", HTTP_429_TOO_MANY_REQUESTS)
+    response.headers["Retry-After"] = str(retry_after(error))
+    response.cache_control.no_store = True
+    return response
+
+
+def init_throttling(app):
+    """Serve 429s from throttled_response and stop logging every breach; the metrics count them instead."""
+    logging.getLogger("flask-limiter").setLevel(logging.WARNING)
+    app.register_error_handler(HTTP_429_TOO_MANY_REQUESTS, throttled_response)
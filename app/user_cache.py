@@ -0,0 +1,77 @@
+import logging
+from collections import namedtuple
+from flask import current_app
+from app.cache import LRUCache
+from app.constants import (
+    USER_RECORD_KEY_PREFIX,
+    USER_RECORD_CACHE_SECONDS,
+    USER_RECORD_LOCAL_MAX_ENTRIES,
+    USER_RECORD_LOCAL_TTL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+UserRecord = namedtuple("UserRecord", ["id", "rerolls", "claimed_today", "timezone"])
+
+# Short-lived copy in front of Redis; other workers' writes show up once it expires
+_local_cache = LRUCache(USER_RECORD_LOCAL_MAX_ENTRIES, ttl=USER_RECORD_LOCAL_TTL_SECONDS)
+
+
+def _record_key(device_id):
+    return f"{USER_RECORD_KEY_PREFIX}{device_id}"
+
+
+def get_cached_user_record(device_id):
+    """Get a device's cached user record without touching the database."""
+    record = _local_cache.get(device_id)
+    if record:
+        return record
+
+    try:
+        fields = current_app.config['REDIS_CLIENT'].hgetall(_record_key(device_id))
+    except Exception as e:
+        logger.error(f"Error reading user record cache: {str(e)}")
+        return None
+
+    if not fields:
+        return None
+
+    record = UserRecord(
+        id=int(fields["id"]),
+        rerolls=int(fields["rerolls"]),
+        claimed_today=fields["claimed_today"] == "1",
+        timezone=fields["timezone"],
+    )
+    _local_cache.set(device_id, record)
+    return record
+
+
+def cache_user_record(device_id, user):
+    """Write a user's current rerolls and claim status through to the cache."""
+    record = UserRecord(user.id, user.rerolls, user.claimed_today, user.timezone)
+    _local_cache.set(device_id, record)
+    try:
+        redis_client = current_app.config['REDIS_CLIENT']
+        redis_client.hset(_record_key(device_id), mapping={
+            "id": record.id,
+            "rerolls": record.rerolls,
+            "claimed_today": int(record.claimed_today),
+            "timezone": record.timezone,
+        })
+        redis_client.expire(_record_key(device_id), USER_RECORD_CACHE_SECONDS)
+    except Exception as e:
+        logger.error(f"Error writing user record cache: {str(e)}")
+    return record
+
+
+def invalidate_user_records(device_ids):
+    """Drop cached records, e.g. after a bulk update of the users table."""
+    for device_id in device_ids:
+        _local_cache.delete(device_id)
+    try:
+        if device_ids:
+            current_app.config['REDIS_CLIENT'].delete(
+                *[_record_key(device_id) for device_id in device_ids]
+            )
+    except Exception as e:
+        logger.error(f"Error invalidating user record cache: {str(e)}")
@@ -0,0 +1,90 @@
+import logging
+from datetime import datetime, timedelta
+import pytz
+import sentry_sdk
+from flask import current_app
+from sqlalchemy import and_
+from sqlalchemy.orm import contains_eager
+from app import db
+from app.models import User, Discount, Store, Claimed
+from app.constants import USER_STATE_KEY_PREFIX, USER_STATE_CACHE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_user_state(device_id):
+    """Get the current state of a device's user in a single query.
+
+    Returns (state, user, discount, claimed) where state is one of "home",
+    "reroll", "voucher", "redeemed" or "error".
+    """
+    try:
+        row = (
+            db.session.query(User, Claimed)
+            .outerjoin(Claimed, and_(Claimed.claimed_by == User.id, Claimed.valid == True))
+            .outerjoin(Discount, Claimed.discount_id == Discount.id)
+            .outerjoin(Store, Discount.store_id == Store.id)
+            .options(contains_eager(Claimed.discount).contains_eager(Discount.store))
+            .filter(User.device_id == device_id)
+            .order_by(Claimed.roll_time.desc())
+            .first()
+        )
+
+        if not row:
+            return "home", None, None, None
+
+        user, claimed_entry = row
+        discount = claimed_entry.discount if claimed_entry else None
+        idle_state = "redeemed" if user.claimed_today else "home"
+
+        if not claimed_entry:
+            return idle_state, user, None, None
+
+        if claimed_entry.claimed is None:
+            return "reroll", user, discount, claimed_entry
+
+        local_claim_time = claimed_entry.local_claim_time
+        if claimed_entry.claimed and not claimed_entry.redeemed and local_claim_time:
+            next_midnight = (local_claim_time + timedelta(days=1)).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+            if datetime.now(pytz.timezone(user.timezone)) < next_midnight:
+                return "voucher", user, discount, claimed_entry
+
+        return idle_state, user, None, None
+    except Exception as e:
+        logger.error(f"Error in resolve_user_state: {str(e)}", exc_info=True)
+        sentry_sdk.capture_exception(e)
+        return "error", None, None, None
+
+
+def _state_key(device_id):
+    return f"{USER_STATE_KEY_PREFIX}{device_id}"
+
+
+def get_cached_user_state(device_id):
+    """Get a device's cached initial_load response body, if any."""
+    try:
+        return current_app.config['REDIS_CLIENT'].get(_state_key(device_id))
+    except Exception as e:
+        logger.error(f"Error reading user state cache: {str(e)}")
+        return None
+
+
+def cache_user_state(device_id, response):
+    """Cache a successful initial_load response body for a device."""
+    try:
+        current_app.config['REDIS_CLIENT'].setex(
+            _state_key(device_id), USER_STATE_CACHE_SECONDS, response.get_data(as_text=True)
+        )
+    except Exception as e:
+        logger.error(f"Error writing user state cache: {str(e)}")
+
+
+def invalidate_user_state(*device_ids):
+    """Drop devices' cached state after a roll, claim, redemption or daily reset."""
+    try:
+        if device_ids:
+            current_app.config['REDIS_CLIENT'].delete(*[_state_key(device_id) for device_id in device_ids])
+    except Exception as e:
+        logger.error(f"Error invalidating user state cache: {str(e)}")
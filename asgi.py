@@ -0,0 +1,5 @@
+"""ASGI entry point that serves the Places endpoints asynchronously."""
+from app import create_app
+from app.asgi import create_asgi_app
+
+app = create_asgi_app(create_app())
@@ -0,0 +1,58 @@
+"""Replay typed-out suburb queries through /api/autocomplete against the fake Places server.
+
+Reports upstream calls per keystroke and latency percentiles for a cold and
+a warm pass. Uses the in-process fallback cache unless Redis is running.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_places_server import SUBURBS, serve
+
+PORT = 8766
+LATENCY = 0.05
+os.environ["PLACES_API_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+import app as app_package
+from app import create_app
+
+
+def keystrokes():
+    """Every prefix a user types on the way to each suburb name."""
+    return [suburb[:length] for suburb in SUBURBS for length in range(3, len(suburb) + 1)]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    server = serve(port=PORT, latency=LATENCY)
+    app = create_app()
+    app_package.limiter.enabled = False
+    client = app.test_client()
+    queries = keystrokes()
+
+    print(f"{'pass':>6} {'requests':>9} {'upstream':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for label in ("cold", "warm"):
+        before = sum(server.RequestHandlerClass.counts.values())
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            client.post("/api/autocomplete", json={"query": query})
+            samples.append(time.perf_counter() - start)
+        upstream = sum(server.RequestHandlerClass.counts.values()) - before
+        print(
+            f"{label:>6} {len(queries):>9} {upstream:>9} "
+            f"{percentile(samples, 0.5) * 1000:>9.2f} {percentile(samples, 0.99) * 1000:>9.2f}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare the per-row geopy loop against the vectorized haversine filter."""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from geopy.distance import geodesic
+from app.distance import haversine_distances
+from app.constants import EARTH_DEGREE_KM
+
+CANDIDATE_COUNTS = [100, 10_000, 100_000]
+USER_LAT, USER_LONG = -33.8688, 151.2093
+MAX_DISTANCE_KM = 2
+
+
+def make_candidates(count):
+    """Generate store coordinates scattered around the user's bounding box."""
+    spread = MAX_DISTANCE_KM * 1.5 / EARTH_DEGREE_KM
+    lats = [USER_LAT + random.uniform(-spread, spread) for _ in range(count)]
+    longs = [USER_LONG + random.uniform(-spread, spread) for _ in range(count)]
+    return lats, longs
+
+
+def geopy_loop(lats, longs):
+    """Filter candidates the way get_random_discount used to."""
+    return [
+        i for i, (lat, long) in enumerate(zip(lats, longs))
+        if geodesic((USER_LAT, USER_LONG), (lat, long)).km <= MAX_DISTANCE_KM
+    ]
+
+
+def vectorized(lats, longs):
+    """Filter candidates with a single haversine call."""
+    distances = haversine_distances(USER_LAT, USER_LONG, lats, longs)
+    return (distances <= MAX_DISTANCE_KM).nonzero()[0].tolist()
+
+
+def best_of(func, *args, repeat=3):
+    """Get the fastest run time and result of a function."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    random.seed(0)
+    print(f"{'candidates':>10} {'geopy (ms)':>12} {'haversine (ms)':>15} {'speedup':>8} {'mismatches':>11}")
+    for count in CANDIDATE_COUNTS:
+        lats, longs = make_candidates(count)
+        geopy_time, geopy_result = best_of(geopy_loop, lats, longs, repeat=1 if count > 10_000 else 3)
+        fast_time, fast_result = best_of(vectorized, lats, longs)
+        mismatches = len(set(geopy_result) ^ set(fast_result))
+        print(
+            f"{count:>10} {geopy_time * 1000:>12.2f} {fast_time * 1000:>15.3f} "
+            f"{geopy_time / fast_time:>7.0f}x {mismatches:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
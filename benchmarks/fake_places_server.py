@@ -0,0 +1,99 @@
+"""Stand-in for the Google Places API, for testing and load testing offline.
+
+Point the app at it with PLACES_API_BASE_URL=http://127.0.0.1:8765 and pass
+--latency to simulate a slow upstream. Every request is counted and the
+counts are served from /stats.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SUBURBS = [
+    "Bondi", "Bondi Junction", "Bondi Beach", "Balmain", "Bankstown", "Barangaroo",
+    "Chatswood", "Coogee", "Cronulla", "Darlinghurst", "Glebe", "Manly",
+    "Marrickville", "Mosman", "Newtown", "Paddington", "Parramatta", "Redfern",
+    "Surry Hills", "Ultimo",
+]
+MAX_RESULTS = 5
+
+
+class FakePlacesHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    counts = {"autocomplete": 0, "details": 0}
+    counts_lock = threading.Lock()
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, endpoint):
+        with self.counts_lock:
+            self.counts[endpoint] += 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/stats":
+            return self._send_json(self.counts)
+
+        time.sleep(self.latency)
+        if url.path.endswith("/autocomplete/json"):
+            self._count("autocomplete")
+            terms = params.get("input", "").lower().split()
+            predictions = [
+                {"description": f"{suburb} NSW, Australia", "place_id": f"place-{suburb.lower().replace(' ', '-')}"}
+                for suburb in SUBURBS
+                if all(any(word.startswith(term) for word in suburb.lower().split()) for term in terms)
+            ][:MAX_RESULTS]
+            return self._send_json(
+                {"predictions": predictions, "status": "OK" if predictions else "ZERO_RESULTS"}
+            )
+
+        if url.path.endswith("/details/json"):
+            self._count("details")
+            digest = hashlib.sha256(params.get("place_id", "").encode()).digest()
+            lat = -33.95 + digest[0] / 255 * 0.3
+            lng = 151.05 + digest[1] / 255 * 0.3
+            return self._send_json(
+                {"result": {"geometry": {"location": {"lat": lat, "lng": lng}}}, "status": "OK"}
+            )
+
+        self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=8765, latency=0.0):
+    """Start the fake server on a background thread and return it."""
+    FakePlacesHandler.latency = latency
+    server = ThreadingHTTPServer((host, port), FakePlacesHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before responding.")
+    args = parser.parse_args()
+
+    FakePlacesHandler.latency = args.latency
+    server = ThreadingHTTPServer((args.host, args.port), FakePlacesHandler)
+    print(f"Fake Places API on http://{args.host}:{args.port} (latency {args.latency}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
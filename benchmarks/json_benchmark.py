@@ -0,0 +1,72 @@
+"""Compare JSON response encoding cost per endpoint for Flask's default provider and orjson."""
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+from flask import render_template
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from app.json_provider import OrjsonProvider
+from app.helpers import STATIC_PAYLOADS
+
+ITERATIONS = 2000
+
+
+def endpoint_payloads():
+    """Representative response bodies for each API endpoint."""
+    store = SimpleNamespace(name="Cafe Example", website="https://example.com")
+    discount = SimpleNamespace(store=store, details="Free coffee with any breakfast", token="")
+    user = SimpleNamespace(rerolls=2)
+    categories = ["Any", "Food", "Drink", "Retail", "Fitness"]
+    return {
+        "initial_load (home)": {"html": render_template("home.html", categories=categories), "is_home": True},
+        "get_discount": {
+            "html": render_template("voucher.html", discount=discount, user=user, category="Food"),
+            "is_home": False,
+        },
+        "redeemed": {"html": render_template("voucher_redeemed.html"), "is_home": False},
+        "get_stores": {"stores": [{"name": f"Store {i}"} for i in range(200)]},
+        "autocomplete": [
+            {"description": f"Suburb {i} NSW, Australia", "place_id": f"place-{i}",
+             "matched_substrings": [{"length": 3, "offset": 0}], "types": ["locality", "political"]}
+            for i in range(5)
+        ],
+        "generic_error": STATIC_PAYLOADS["generic_error"],
+    }
+
+
+def time_provider(provider, payload):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        provider.response(payload)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def main():
+    app = create_app()
+    app.debug = False
+    default, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+
+    with app.test_request_context():
+        payloads = endpoint_payloads()
+        print(f"{'endpoint':>20} {'bytes':>7} {'default (us)':>13} {'orjson (us)':>12} {'speedup':>8}")
+        for name, payload in payloads.items():
+            size = len(default.response(payload).get_data())
+            default_us, fast_us = time_provider(default, payload), time_provider(fast, payload)
+            print(f"{name:>20} {size:>7} {default_us:>13.1f} {fast_us:>12.1f} {default_us / fast_us:>7.1f}x")
+
+        pre_encoded = app.extensions["static_payloads"]["generic_error"]
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            app.response_class(pre_encoded, mimetype="application/json")
+        print(f"{'generic_error (pre)':>20} {len(pre_encoded):>7} "
+              f"{(time.perf_counter() - start) / ITERATIONS * 1e6:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Load test the Places endpoints under sync gunicorn workers and under the ASGI app.
+
+Starts the fake Places server with a slow upstream, then for each server mode
+fires a burst of concurrent autocomplete requests (unique queries, plus a
+group of identical ones) while probing a cheap route. With sync workers the
+probe queues behind the slow upstream calls; with the ASGI app it does not.
+"""
+import os
+import random
+import socket
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from fake_places_server import serve
+
+ROOT = Path(__file__).resolve().parent.parent
+UPSTREAM_PORT = 8768
+APP_PORT = 8769
+LATENCY = 0.5
+UNIQUE_QUERIES = 40
+IDENTICAL_QUERIES = 20
+SYNC_WORKERS = 2
+
+MODES = {
+    "gunicorn sync": ["gunicorn", "-w", str(SYNC_WORKERS), "-b", f"127.0.0.1:{APP_PORT}", "run:app"],
+    "uvicorn asgi": ["uvicorn", "--port", str(APP_PORT), "--log-level", "warning", "asgi:app"],
+}
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+def timed_post(url, payload):
+    start = time.perf_counter()
+    requests.post(url, json=payload, timeout=60)
+    return time.perf_counter() - start
+
+
+def timed_get(url):
+    start = time.perf_counter()
+    requests.get(url, timeout=60)
+    return time.perf_counter() - start
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_mode(command, upstream):
+    env = dict(
+        os.environ,
+        PLACES_API_BASE_URL=f"http://127.0.0.1:{UPSTREAM_PORT}",
+        RATELIMIT_ENABLED="false",
+        DATABASE_URI=f"sqlite:///{tempfile.mkdtemp()}/load.db",
+    )
+    # create_app no longer creates tables, so give the fresh database its schema first
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "run", "schema", "create"],
+        cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(APP_PORT)
+        base = f"http://127.0.0.1:{APP_PORT}"
+        requests.get(f"{base}/api/get_stores", timeout=30)
+
+        queries = ["".join(random.choices(string.ascii_lowercase, k=8)) for _ in range(UNIQUE_QUERIES)]
+        queries += ["bondi"] * IDENTICAL_QUERIES
+        before = upstream.RequestHandlerClass.counts["autocomplete"]
+
+        with ThreadPoolExecutor(max_workers=len(queries) + 1) as pool:
+            start = time.perf_counter()
+            futures = [
+                pool.submit(timed_post, f"{base}/api/autocomplete", {"query": query}) for query in queries
+            ]
+            time.sleep(0.05)
+            probe = pool.submit(timed_get, f"{base}/api/get_stores")
+            samples = [future.result() for future in futures]
+            elapsed = time.perf_counter() - start
+
+        upstream_calls = upstream.RequestHandlerClass.counts["autocomplete"] - before
+        return elapsed, percentile(samples, 0.99), probe.result(), upstream_calls, len(queries)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    upstream = serve(port=UPSTREAM_PORT, latency=LATENCY)
+    print(f"upstream latency {LATENCY}s, {UNIQUE_QUERIES} unique + {IDENTICAL_QUERIES} identical concurrent queries")
+    print(f"{'mode':>14} {'wall (s)':>9} {'p99 (s)':>8} {'probe (s)':>10} {'upstream':>9}")
+    for label, command in MODES.items():
+        elapsed, p99, probe, upstream_calls, total = run_mode(command, upstream)
+        print(f"{label:>14} {elapsed:>9.2f} {p99:>8.2f} {probe:>10.2f} {upstream_calls:>6}/{total}")
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""Compare encode time and bytes per token for each QR renderer."""
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.qr_codes import QR_FORMATS, render_qr_code
+
+TOKENS = 200
+BASE_URL = "https://example.com/redeem/"
+
+
+def main():
+    urls = [f"{BASE_URL}{uuid.uuid4()}" for _ in range(TOKENS)]
+    print(f"{'renderer':>16} {'encode (ms)':>12} {'bytes/token':>12}")
+    for name, qr_format in QR_FORMATS.items():
+        variants = [(name, False)]
+        if qr_format.compressible:
+            variants.append((f"{name}+gzip", True))
+
+        for label, precompress in variants:
+            start = time.perf_counter()
+            sizes = [len(render_qr_code(url, qr_format, precompress)) for url in urls]
+            elapsed = time.perf_counter() - start
+            print(f"{label:>16} {elapsed / TOKENS * 1000:>12.2f} {sum(sizes) / TOKENS:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
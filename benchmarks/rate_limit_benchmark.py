@@ -0,0 +1,112 @@
+"""Count Redis round trips made by the fixed-window and tiered rate limit strategies.
+
+Simulates several workers sharing one Redis, each with its own limiter, and replays the same
+clients through both strategies against RATE_LIMIT_STANDARD. Time is simulated, so the run is
+fast. Uses the Redis at REDIS_HOST:REDIS_PORT if one is running, otherwise fakeredis.
+"""
+import os
+import random
+import sys
+import types
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+import redis
+from limits import parse_many
+from limits.storage import RedisStorage
+from limits.strategies import FixedWindowRateLimiter
+
+from app import rate_limits
+from app.constants import RATE_LIMIT_STANDARD
+
+WORKERS = 4
+SCENARIOS = [
+    # name, clients, requests per client, seconds between a client's requests
+    ("steady", 200, 8, 3.0),
+    ("burst", 200, 8, 0.05),
+    ("abusive", 20, 40, 0.05),
+]
+
+
+class Clock:
+    """Stands in for the time module inside app.rate_limits."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+def redis_storage():
+    """A limits RedisStorage whose client counts the commands it sends."""
+    host = os.environ.get("REDIS_HOST", "localhost")
+    port = int(os.environ.get("REDIS_PORT", 6379))
+    uri = f"redis://{host}:{port}"
+    storage = RedisStorage(uri)
+    try:
+        storage.get_connection().ping()
+    except redis.ConnectionError:
+        import fakeredis
+        storage.storage = fakeredis.FakeRedis()
+        storage.initialize_storage(uri)
+
+    client = storage.get_connection()
+    client.commands = 0
+    execute_command = client.execute_command
+
+    def counted(*args, **options):
+        client.commands += 1
+        return execute_command(*args, **options)
+
+    client.execute_command = counted
+    return storage, client
+
+
+def requests_for(clients, per_client, spacing, rng):
+    """(time, worker, client) for every request, in arrival order."""
+    events = []
+    for client in range(clients):
+        start = rng.uniform(0, 30)
+        for n in range(per_client):
+            events.append((start + n * spacing, rng.randrange(WORKERS), client))
+    return sorted(events)
+
+
+def run(strategy, events, storage, clock, run_id):
+    """Replay the requests, checking every limit the way Flask-Limiter does. Returns requests allowed."""
+    limiters = [strategy(storage) for _ in range(WORKERS)]
+    items = parse_many(RATE_LIMIT_STANDARD)
+    allowed = 0
+    for offset, worker, client in events:
+        clock.now = 1_000_000.0 + offset
+        identifier = f"{run_id}-{client}"
+        if all(limiters[worker].hit(item, "benchmark", identifier) for item in items):
+            allowed += 1
+    return allowed
+
+
+def main():
+    storage, client = redis_storage()
+    clock = Clock()
+    rate_limits.time = types.SimpleNamespace(time=clock.time)
+    rng = random.Random(1)
+
+    print(f"{WORKERS} workers, limits {RATE_LIMIT_STANDARD!r}")
+    print(f"{'scenario':<10} {'requests':>8} {'strategy':<20} {'allowed':>8} {'round trips':>12}")
+    for name, clients, per_client, spacing in SCENARIOS:
+        events = requests_for(clients, per_client, spacing, rng)
+        for label, strategy in (
+            ("fixed-window", FixedWindowRateLimiter),
+            (rate_limits.TIERED_STRATEGY, rate_limits.TieredFixedWindowRateLimiter),
+        ):
+            client.commands = 0
+            allowed = run(strategy, events, storage, clock, uuid.uuid4().hex)
+            print(f"{name:<10} {len(events):>8} {label:<20} {allowed:>8} {client.commands:>12}")
+
+
+if __name__ == "__main__":
+    main()
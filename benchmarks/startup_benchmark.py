@@ -0,0 +1,83 @@
+"""Measure how long a worker takes to serve its first request, with and without gunicorn's preload.
+
+Without preload every worker imports the app and runs create_app itself. With preload the master
+does that once and workers are forked from it, so their startup is the fork plus the first request.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+
+RUNS = 5
+DEFERRED_MODULES = ["boto3", "watchtower", "qrcode", "PIL", "geopy"]
+
+COLD_WORKER = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get("/").status_code
+served = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "create_app": created - imported,
+    "first_request": served - created,
+    "status": status,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def cold_worker():
+    """Start a worker the way gunicorn does without preload, in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_WORKER % DEFERRED_MODULES],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def preloaded_worker(application):
+    """Fork a worker from an app built in this process and time it until its first response."""
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        status = application.test_client().get("/").status_code
+        os.write(write_fd, json.dumps({"status": status}).encode())
+        os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        result = json.loads(pipe.read())
+    result["seconds"] = time.perf_counter() - start
+    os.waitpid(pid, 0)
+    return result
+
+
+def main():
+    cold = [cold_worker() for _ in range(RUNS)]
+    for name in ("import", "create_app", "first_request"):
+        print(f"cold worker {name:<14} median {sorted(run[name] for run in cold)[RUNS // 2] * 1000:8.1f} ms")
+    total = sorted(run["import"] + run["create_app"] + run["first_request"] for run in cold)[RUNS // 2]
+    print(f"cold worker total          median {total * 1000:8.1f} ms")
+    print(f"heavy modules loaded at startup: {cold[0]['loaded'] or 'none'}")
+
+    from app import create_app
+
+    application = create_app()
+    forked = sorted(preloaded_worker(application)["seconds"] for _ in range(RUNS))
+    print(f"preloaded worker to first response median {forked[RUNS // 2] * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,32 @@
+import json
 import os
+import time
 from dotenv import load_dotenv
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError, BotoCoreError
 
 load_dotenv()  # Load .env file for development
 
+SSM_CACHE_FILE = os.environ.get(
+    'SSM_CACHE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.ssm_cache.json')
+)
+SSM_CACHE_SECONDS = int(os.environ.get('SSM_CACHE_SECONDS', 900))
+
 def get_ssm_parameters(path):
-    """Get parameters from AWS SSM Parameter Store."""
+    """Get parameters from AWS SSM Parameter Store, following every page of results."""
+    # boto3 is slow to import, so only load it when SSM is actually needed
+    import boto3
+    from botocore.exceptions import ClientError, NoCredentialsError, BotoCoreError
+
     try:
         # Create a boto3 session
         session = boto3.Session(region_name='ap-southeast-2')
         ssm = session.client('ssm')
         
         parameters = {}
-        response = ssm.get_parameters_by_path(
-            Path=path,
-            Recursive=True,
-            WithDecryption=True
-        )
-        for param in response['Parameters']:
-            name = param['Name'].split('/')[-1]
-            parameters[name] = param['Value']
+        paginator = ssm.get_paginator('get_parameters_by_path')
+        for page in paginator.paginate(Path=path, Recursive=True, WithDecryption=True):
+            for param in page['Parameters']:
+                name = param['Name'].split('/')[-1]
+                parameters[name] = param['Value']
         return parameters
     except (ClientError, NoCredentialsError, BotoCoreError) as e:
         # In local development without AWS creds, this might fail.
@@ -28,6 +34,35 @@ def get_ssm_parameters(path):
         print(f"Warning: Could not fetch parameters from SSM: {e}")
         return {}
 
+def read_ssm_cache(cache_file, max_age):
+    """Read cached SSM parameters, or None if the cache file is missing or stale."""
+    try:
+        if time.time() - os.path.getmtime(cache_file) > max_age:
+            return None
+        with open(cache_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_ssm_cache(cache_file, parameters):
+    """Write SSM parameters to the cache file, readable by the current user only."""
+    tmp_file = f"{cache_file}.tmp"
+    try:
+        with os.fdopen(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            json.dump(parameters, f)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"Warning: Could not write SSM cache file: {e}")
+
+def load_ssm_parameters(path):
+    """Get SSM parameters from the local cache file when it is fresh, otherwise from SSM."""
+    parameters = read_ssm_cache(SSM_CACHE_FILE, SSM_CACHE_SECONDS) if SSM_CACHE_FILE else None
+    if parameters is None:
+        parameters = get_ssm_parameters(path)
+        if parameters and SSM_CACHE_FILE:
+            write_ssm_cache(SSM_CACHE_FILE, parameters)
+    return parameters
+
 # Cache SSM parameters to avoid repeated calls
 _ssm_params = None
 
@@ -42,7 +77,7 @@ def get_config_value(key, default=None):
     global _ssm_params
     if _ssm_params is None:
         # or just try and fail gracefully.
-        _ssm_params = get_ssm_parameters('/myapp/')
+        _ssm_params = load_ssm_parameters('/myapp/')
     
     return _ssm_params.get(key, default)
 
@@ -55,9 +90,29 @@ class Config:
     REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
     REDIS_PASSWORD = get_config_value('REDIS_PASSWORD')
     VOUCHER_DISTANCE = int(os.environ.get('VOUCHER_DISTANCE', 2))
+    DISTANCE_MODE = os.environ.get('DISTANCE_MODE', 'haversine')
+    QR_RENDERER = os.environ.get('QR_RENDERER', 'png')
+    QR_PRECOMPRESS = os.environ.get('QR_PRECOMPRESS', 'true').lower() == 'true'
     SQLALCHEMY_DATABASE_URI = get_config_value('DATABASE_URI', 'sqlite:///development.db')
+    SQLALCHEMY_REPLICA_URIS = [
+        uri.strip() for uri in (get_config_value('DATABASE_REPLICA_URIS') or '').split(',') if uri.strip()
+    ]
+    SQLALCHEMY_POOL_SIZE = int(os.environ.get('SQLALCHEMY_POOL_SIZE', 5))
+    SQLALCHEMY_MAX_OVERFLOW = int(os.environ.get('SQLALCHEMY_MAX_OVERFLOW', 5))
+    SQLALCHEMY_POOL_TIMEOUT = int(os.environ.get('SQLALCHEMY_POOL_TIMEOUT', 10))
+    SQLALCHEMY_POOL_RECYCLE = int(os.environ.get('SQLALCHEMY_POOL_RECYCLE', 1800))
+    SQLALCHEMY_POOL_PRE_PING = os.environ.get('SQLALCHEMY_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 5000))
     GOOGLE_PLACES_API_KEY = get_config_value('GOOGLE_PLACES_API_KEY')
+    PLACES_API_BASE_URL = os.environ.get('PLACES_API_BASE_URL', 'https://maps.googleapis.com/maps/api/place')
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
     SENTRY_DSN = get_config_value('SENTRY_DSN')
+    SENTRY_TRACES_SAMPLE_RATE = float(os.environ.get('SENTRY_TRACES_SAMPLE_RATE', 0.01))
+    SENTRY_ENDPOINT_SAMPLE_RATES = os.environ.get('SENTRY_ENDPOINT_SAMPLE_RATES', '')
+    TELEMETRY_SINK = os.environ.get('TELEMETRY_SINK', 'cloudwatch')
+    METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 0.1))
+    METRICS_TOKEN = get_config_value('METRICS_TOKEN')
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
 
     @classmethod
     def init_app(cls, app):
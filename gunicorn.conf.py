@@ -0,0 +1,23 @@
+"""Gunicorn settings.
+
+The app, its config and its SSM parameters are loaded once in the master and shared with
+the workers by fork, so workers start without importing or fetching anything.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+preload_app = True
+wsgi_app = "run:app"
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master so workers never share a socket."""
+    from app import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
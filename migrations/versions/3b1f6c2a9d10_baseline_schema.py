@@ -0,0 +1,90 @@
+"""baseline schema
+
+The tables as they were before migrations were added. Databases created
+with db.create_all() before then should be stamped with this revision.
+
+Revision ID: 3b1f6c2a9d10
+Revises: 
+Create Date: 2026-10-17 02:45:57.486593
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f6c2a9d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stores',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('website', sa.String(length=255), nullable=False),
+    sa.Column('lat', sa.DECIMAL(precision=9, scale=6), nullable=False),
+    sa.Column('long', sa.DECIMAL(precision=9, scale=6), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.String(length=255), nullable=False),
+    sa.Column('rerolls', sa.Integer(), nullable=False),
+    sa.Column('timezone', sa.String(length=255), nullable=False),
+    sa.Column('claimed_today', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('device_id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('idx_device_id', ['device_id'], unique=False)
+
+    op.create_table('discounts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('details', sa.String(length=255), nullable=False),
+    sa.Column('unlimited_use', sa.Boolean(), nullable=False),
+    sa.Column('remaining', sa.Integer(), nullable=True),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('available', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('claimed',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('claimed', sa.Boolean(), nullable=True),
+    sa.Column('claimed_by', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(length=36), nullable=False),
+    sa.Column('redeemed', sa.Boolean(), nullable=False),
+    sa.Column('selected_category', sa.String(length=50), nullable=False),
+    sa.Column('discount_id', sa.Integer(), nullable=False),
+    sa.Column('roll_time', sa.DateTime(), nullable=False),
+    sa.Column('claim_time', sa.DateTime(), nullable=True),
+    sa.Column('redeemed_time', sa.DateTime(), nullable=True),
+    sa.Column('valid', sa.Boolean(), nullable=True),
+    sa.Column('user_timezone', sa.String(length=50), nullable=False),
+    sa.ForeignKeyConstraint(['claimed_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['discount_id'], ['discounts.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token')
+    )
+    with op.batch_alter_table('claimed', schema=None) as batch_op:
+        batch_op.create_index('idx_claimed_by_valid', ['claimed_by', 'valid'], unique=False)
+        batch_op.create_index('idx_roll_time', ['roll_time'], unique=False)
+        batch_op.create_index('idx_token', ['token'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('claimed', schema=None) as batch_op:
+        batch_op.drop_index('idx_token')
+        batch_op.drop_index('idx_roll_time')
+        batch_op.drop_index('idx_claimed_by_valid')
+
+    op.drop_table('claimed')
+    op.drop_table('discounts')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('idx_device_id')
+
+    op.drop_table('users')
+    op.drop_table('stores')
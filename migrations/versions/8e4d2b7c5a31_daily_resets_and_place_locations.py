@@ -0,0 +1,61 @@
+"""daily resets, place locations and the users timezone index
+
+Databases built with `flask schema create` before migrations existed may
+already have some of these, so each one is only created when missing.
+
+Revision ID: 8e4d2b7c5a31
+Revises: 3b1f6c2a9d10
+Create Date: 2026-10-17 02:47:12.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4d2b7c5a31'
+down_revision = '3b1f6c2a9d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    user_indexes = {index['name'] for index in inspector.get_indexes('users')}
+
+    if 'daily_resets' not in tables:
+        op.create_table('daily_resets',
+        sa.Column('timezone', sa.String(length=255), nullable=False),
+        sa.Column('reset_date', sa.Date(), nullable=True),
+        sa.Column('in_progress_date', sa.Date(), nullable=True),
+        sa.Column('last_user_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('timezone')
+        )
+    if 'place_locations' not in tables:
+        op.create_table('place_locations',
+        sa.Column('place_id', sa.String(length=255), nullable=False),
+        sa.Column('lat', sa.DECIMAL(precision=9, scale=6), nullable=False),
+        sa.Column('long', sa.DECIMAL(precision=9, scale=6), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('place_id')
+        )
+
+    if 'idx_timezone_id' in user_indexes:
+        return
+    # Build the index without blocking writes to a large users table on PostgreSQL
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('idx_timezone_id', 'users', ['timezone', 'id'], unique=False,
+                            postgresql_concurrently=True)
+    else:
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.create_index('idx_timezone_id', ['timezone', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('idx_timezone_id')
+
+    op.drop_table('place_locations')
+    op.drop_table('daily_resets')
@@ -1,8 +1,11 @@
 """Main entry point for the application."""
-from app import create_app
+from app import create_app, db
 
 app = create_app()
 
 
 if __name__ == "__main__":
+    # Servers run `flask --app run schema create` at deploy time instead
+    with app.app_context():
+        db.create_all()
     app.run(host="0.0.0.0", port=5000, debug=True)